@@ -12,7 +12,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from utils.logger_config import setup_logging
-from services.resume_parser import ResumeParser
+from services.resume_parser import get_resume_parser
 from services.linkedin_scraper import LinkedInScraper
 from services.job_matcher import JobMatcher
 from models.schemas import JobResult, ResumeData, SearchResponse
@@ -35,7 +35,7 @@ app.add_middleware(
 )
 
 # Initialize services
-resume_parser = ResumeParser()
+resume_parser = get_resume_parser()
 linkedin_scraper = LinkedInScraper()
 job_matcher = JobMatcher()
 
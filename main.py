@@ -1,6 +1,10 @@
 from fastapi import FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from typing import Optional
+from dataclasses import asdict
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import os
 from dotenv import load_dotenv
 from utils.logger_config import setup_logging
@@ -8,7 +12,7 @@ from utils.logger_config import setup_logging
 # Setup logging
 logger = setup_logging()
 
-from services.resume_parser import ResumeParser
+from services.resume_parser import get_resume_parser
 from services.linkedin_scraper import LinkedInScraper
 from services.job_matcher import JobMatcher
 from services.crustdata_api import CrustDataAPI
@@ -17,7 +21,7 @@ from services.resume_manager import ResumeManager
 from services.resume_fetcher import ResumeFetcher
 from services.ats_scorer import ATSScorer
 from models.schemas import (
-    JobResult, ResumeData, SearchResponse, JobDescriptionInput,
+    JobResult, ResumeData, SearchResponse, JobDescriptionInput, CandidateSearchInput,
     CandidateSearchResponse, CandidateProfile, ResumeCandidate,
     ResumeCandidateSearchResponse, ATSScoreRequest, ATSScoreResponse
 )
@@ -27,7 +31,8 @@ load_dotenv()
 app = FastAPI(
     title="LinkedIn Job Scraper & AI-Powered Candidate Finder API",
     description="Comprehensive API for LinkedIn job scraping and candidate discovery using both CrustData API and resume vector search with OpenAI-powered analysis",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -38,8 +43,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _resume_parser_workers() -> int:
+    """Resume parser process count from RESUME_PARSER_WORKERS, defaulting to the CPU count"""
+    default = os.cpu_count() or 1
+    value = os.getenv("RESUME_PARSER_WORKERS")
+    if not value:
+        return default
+    try:
+        workers = int(value)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        logger.warning(f"⚠️ Invalid RESUME_PARSER_WORKERS={value!r}, using {default}")
+        return default
+    return workers
+
 # Initialize services
-resume_parser = ResumeParser()
+resume_parser = get_resume_parser()
+# Process pool for CPU-bound resume parsing, created in the startup hook rather than at
+# import: spawned workers re-import the launching module, and must not build another pool
+resume_parser_pool: Optional[ProcessPoolExecutor] = None
 linkedin_scraper = LinkedInScraper()
 job_matcher = JobMatcher()
 crustdata_api = CrustDataAPI()
@@ -48,6 +71,27 @@ resume_manager = ResumeManager()
 resume_fetcher = ResumeFetcher()
 ats_scorer = ATSScorer()
 
+@app.on_event("startup")
+async def startup_event():
+    """Start the resume parser worker processes"""
+    global resume_parser_pool
+    # Each worker builds its parser once on start. Spawned rather than forked so workers
+    # never inherit this process's parser, its SQLite connection or running threads
+    resume_parser_pool = ProcessPoolExecutor(
+        max_workers=_resume_parser_workers(),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=get_resume_parser
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled HTTP connections, worker pools, caches and parser worker processes"""
+    await resume_fetcher.close()
+    resume_manager.close()
+    if resume_parser_pool is not None:
+        resume_parser_pool.shutdown(wait=False, cancel_futures=True)
+    resume_parser.resume_cache.close()
+
 @app.post("/api/v1/search-jobs", response_model=SearchResponse)
 async def search_jobs(
     file: UploadFile = File(...),
@@ -61,7 +105,7 @@ async def search_jobs(
         logger.info(f"Processing resume: {file.filename}")
         
         # Parse resume directly from UploadFile
-        resume_data = await resume_parser.parse_pdf(file)
+        resume_data = await resume_parser.parse_pdf(file, executor=resume_parser_pool)
         
         if not resume_data.skills:
             raise HTTPException(status_code=400, detail="Could not extract skills from resume")
@@ -94,7 +138,7 @@ async def search_jobs(
         raise HTTPException(status_code=500, detail=f"Processing error: {str(e)}")
 
 @app.post("/api/v1/find-candidates", response_model=CandidateSearchResponse)
-async def find_candidates(job_input: JobDescriptionInput):
+async def find_candidates(job_input: CandidateSearchInput):
     """
     Find candidates based on job description using OpenAI + CrustData API
     
@@ -108,13 +152,16 @@ async def find_candidates(job_input: JobDescriptionInput):
     - Automatic fallback to simplified search if needed
     - Candidate ranking based on job requirements
     - **Now limited to 10 results instead of 20**
+    - Optional `top_k` to return only the best ranked candidates
+    - Optional `no_cache` to bypass cached filters for a repeated job description
     """
     try:
         logger.info("🤖 Starting AI-powered candidate search")
         
         # Use OpenAI + CrustData API for intelligent candidate search
         search_results = await crustdata_api.search_candidates_from_job_description(
-            job_input.job_description
+            job_input.job_description,
+            use_cache=not job_input.no_cache
         )
         
         # Extract parsing info and profiles
@@ -136,7 +183,7 @@ async def find_candidates(job_input: JobDescriptionInput):
             ranked_candidates = candidate_matcher.rank_candidates(
                 candidates, 
                 job_input.job_description
-            )
+            )[:job_input.top_k]
         else:
             ranked_candidates = []
         
@@ -154,7 +201,8 @@ async def find_candidates(job_input: JobDescriptionInput):
                 "experience_levels": filters_used.get('experience_levels', []),
                 "ai_strategy": parsing_info.get('search_strategy', 'OpenAI optimized search'),
                 "filters_applied": parsing_info.get('total_filters_applied', 0),
-                "result_limit": 10  # New field to show the limit
+                "result_limit": 10,  # New field to show the limit
+                "top_k": job_input.top_k
             },
             extracted_keywords=filters_used.get('keywords', [])
         )
@@ -194,6 +242,7 @@ async def match_resumes(job_input: JobDescriptionInput, top_k: Optional[int] = 1
             top_k
         )
         
+        result['candidates'] = [asdict(candidate) for candidate in result['candidates']]
         return ResumeCandidateSearchResponse(**result)
         
     except Exception as e:
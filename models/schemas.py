@@ -50,6 +50,19 @@ class JobDescriptionInput(BaseModel):
     """Input schema for job description text"""
     job_description: str
 
+class CandidateSearchInput(JobDescriptionInput):
+    """Input schema for CrustData candidate search"""
+    top_k: int = 10
+    no_cache: bool = False  # Force a fresh OpenAI parse of the job description
+    
+    @field_validator('top_k')
+    @classmethod
+    def validate_top_k(cls, v):
+        """Require at least one candidate to be returned"""
+        if v < 1:
+            raise ValueError("top_k must be at least 1")
+        return v
+
 class CandidateProfile(BaseModel):
     """Candidate profile structure from CrustData API"""
     name: str
@@ -1,3 +1,4 @@
+import asyncio
 import requests
 import os
 from typing import List, Dict, Any, Optional
@@ -19,6 +20,10 @@ class CrustDataAPI:
             "Content-Type": "application/json"
         }
         
+        # Reuse one keep-alive connection pool for every CrustData call
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        
         # Initialize OpenAI parser with error handling
         try:
             self.openai_parser = OpenAIJobParser()
@@ -30,13 +35,15 @@ class CrustDataAPI:
             self.openai_parser = None
             self.openai_available = False
     
-    async def search_candidates_from_job_description(self, job_description: str, page: int = 1) -> Dict[str, Any]:
+    async def search_candidates_from_job_description(self, job_description: str, page: int = 1,
+                                                     use_cache: bool = True) -> Dict[str, Any]:
         """
         Search for candidates using OpenAI to parse job description and generate optimal filters
         
         Args:
             job_description: Raw job description text
             page: Page number for pagination
+            use_cache: Allow filters cached for an identical earlier description
             
         Returns:
             Dict containing the API response with candidate profiles and parsing info
@@ -45,7 +52,9 @@ class CrustDataAPI:
             if self.openai_available:
                 logger.info("Starting intelligent candidate search with OpenAI parsing")
                 # Use OpenAI to parse job description and generate optimal filters
-                parsed_filters = self.openai_parser.parse_job_description(job_description)
+                parsed_filters = await asyncio.to_thread(
+                    self.openai_parser.parse_job_description, job_description, use_cache
+                )
             else:
                 logger.info("Using fallback parsing (OpenAI not available)")
                 # Use basic fallback parsing
@@ -102,9 +111,10 @@ class CrustDataAPI:
             
             logger.info(f"Calling CrustData API with filters: {filters}")
             
-            response = requests.post(
+            # Blocking HTTP runs in a worker thread so concurrent searches overlap
+            response = await asyncio.to_thread(
+                self.session.post,
                 self.base_url,
-                headers=self.headers,
                 json=payload,
                 timeout=60
             )
@@ -173,9 +183,9 @@ class CrustDataAPI:
             
             logger.info(f"Simplified search with filters: {filters}")
             
-            response = requests.post(
+            response = await asyncio.to_thread(
+                self.session.post,
                 self.base_url,
-                headers=self.headers,
                 json=payload,
                 timeout=60
             )
@@ -337,9 +347,9 @@ class CrustDataAPI:
             
             logger.info(f"Searching candidates with filters: {filters}")
             
-            response = requests.post(
+            response = await asyncio.to_thread(
+                self.session.post,
                 self.base_url,
-                headers=self.headers,
                 json=payload,
                 timeout=60  # Increased timeout to 60 seconds
             )
@@ -404,9 +414,9 @@ class CrustDataAPI:
             
             logger.info(f"Fallback search with filters: {filters}")
             
-            response = requests.post(
+            response = await asyncio.to_thread(
+                self.session.post,
                 self.base_url,
-                headers=self.headers,
                 json=payload,
                 timeout=60
             )
@@ -80,12 +80,14 @@ class GoogleDriveService:
             logger.error(f"❌ Error listing resume files: {str(e)}")
             raise
     
-    def download_file_content(self, file_id: str, max_retries: int = 3) -> bytes:
+    def download_file_content(self, file_id: str, max_retries: int = 3, file_name: Optional[str] = None) -> bytes:
         """
         Download file content from Google Drive
         
         Args:
             file_id: Google Drive file ID
+            max_retries: Number of download attempts before giving up
+            file_name: File name if already known from a folder listing (skips the metadata request)
             
         Returns:
             File content as bytes
@@ -97,9 +99,11 @@ class GoogleDriveService:
         
         for attempt in range(max_retries):
             try:
-                # Get file metadata first
-                file_metadata = self.service.files().get(fileId=file_id).execute()
-                logger.info(f"📥 Downloading file: {file_metadata.get('name', 'Unknown')} (attempt {attempt + 1})")
+                # Get file metadata first, unless the caller already listed it
+                if file_name is None:
+                    file_metadata = self.service.files().get(fileId=file_id).execute()
+                    file_name = file_metadata.get('name', 'Unknown')
+                logger.info(f"📥 Downloading file: {file_name} (attempt {attempt + 1})")
                 
                 # Download file content
                 request = self.service.files().get_media(fileId=file_id)
@@ -109,7 +109,7 @@ class LinkedInScraper:
                 response = self.session.get(url, timeout=10)
                 response.raise_for_status()
                 
-                page_jobs = self._parse_job_listings(response.text, url)
+                page_jobs = self._parse_job_listings(response.text, url, max_results - len(jobs))
                 jobs.extend(page_jobs)
                 
                 self._random_delay()
@@ -128,8 +128,8 @@ class LinkedInScraper:
         logger.warning("Selenium scraping not available in serverless deployment")
         return []
     
-    def _parse_job_listings(self, html: str, source_url: str) -> List[JobResult]:
-        """Parse job listings from HTML"""
+    def _parse_job_listings(self, html: str, source_url: str, limit: int) -> List[JobResult]:
+        """Parse job listings from HTML, stopping once `limit` jobs are collected"""
         jobs = []
         
         try:
@@ -145,6 +145,8 @@ class LinkedInScraper:
                     job = self._extract_job_from_soup(card, source_url)
                     if job:
                         jobs.append(job)
+                        if len(jobs) >= limit:
+                            break
                 except Exception as e:
                     logger.warning(f"Failed to parse job card: {str(e)}")
                     continue
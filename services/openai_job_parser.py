@@ -1,6 +1,10 @@
 import os
+import copy
 import json
+import hashlib
+import threading
 from typing import Dict, Any
+from cachetools import TTLCache
 from openai import OpenAI
 from utils.logger_config import setup_logging
 
@@ -25,18 +29,34 @@ class OpenAIJobParser:
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI client: {str(e)}")
             raise ValueError(f"OpenAI client initialization failed: {str(e)}")
+        
+        # Identical job descriptions (e.g. repeated requests) reuse their filters
+        # without any OpenAI call
+        self._exact_filter_cache = TTLCache(maxsize=256, ttl=3600)
+        self._exact_filter_cache_lock = threading.Lock()
     
-    def parse_job_description(self, job_description: str) -> Dict[str, Any]:
+    def parse_job_description(self, job_description: str, use_cache: bool = True) -> Dict[str, Any]:
         """
         Use OpenAI to parse job description and generate optimal CrustData API filters
         
         Args:
             job_description: Raw job description text
+            use_cache: Reuse filters from an identical earlier description; pass False
+                to always run a fresh GPT parse (nothing is cached either)
             
         Returns:
             Dictionary with CrustData API compatible filters
         """
         try:
+            text_hash = None
+            if use_cache:
+                text_hash = hashlib.sha256(job_description.encode()).hexdigest()
+                with self._exact_filter_cache_lock:
+                    cached_filters = self._exact_filter_cache.get(text_hash)
+                if cached_filters is not None:
+                    logger.info("Using cached filters for identical job description")
+                    return copy.deepcopy(cached_filters)
+            
             logger.info("Using OpenAI to parse job description for optimal candidate search")
             
             # Create a detailed prompt for OpenAI
@@ -72,6 +92,9 @@ class OpenAIJobParser:
                 parsed_result = json.loads(json_str)
                 logger.info("Successfully parsed OpenAI response")
                 
+                if text_hash is not None:
+                    with self._exact_filter_cache_lock:
+                        self._exact_filter_cache[text_hash] = copy.deepcopy(parsed_result)
                 return parsed_result
                 
             except json.JSONDecodeError as e:
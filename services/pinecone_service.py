@@ -1,11 +1,22 @@
 import os
+import json
 import time
-from typing import List, Dict, Any, Optional
-from pinecone import Pinecone, ServerlessSpec
+import threading
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from pinecone import ServerlessSpec
+from pinecone.grpc import PineconeGRPC
+from pybloom_live import BloomFilter
+from services.semantic_cache import SemanticQueryCache
 from utils.logger_config import setup_logging
 
 logger = setup_logging()
 
+def _to_values(embedding: Union[np.ndarray, List[float]]) -> List[float]:
+    """Convert an embedding (float32 array or list) to the float list the client sends"""
+    return np.asarray(embedding, dtype=np.float32).tolist()
+
 class PineconeService:
     """Service for managing Pinecone vector database operations"""
     
@@ -14,19 +25,45 @@ class PineconeService:
         self.environment = os.getenv('PINECONE_ENVIRONMENT', 'gcp-starter')
         self.index_name = os.getenv('PINECONE_INDEX_NAME', 'resume')
         self.dimension = 1536  # OpenAI text-embedding-ada-002 dimensions
+        self.upsert_max_workers = 20  # Max in-flight upsert batches (avoids 429s)
+        
+        # Reuse results for near-duplicate job description queries. Unrelated ada-002
+        # texts often score 0.9-0.98, so only near-verbatim queries may share results.
+        # Upserts and deletes clear this process's cache only; other workers keep
+        # serving their cached results until the TTL (1 hour) expires
+        self.query_cache = SemanticQueryCache(self.dimension, threshold=0.99)
+        
+        # IDs upserted by this process; probable hits are confirmed with a fetch
+        self._known_ids = BloomFilter(capacity=1_000_000, error_rate=0.001)
+        self._known_ids_lock = threading.Lock()
+        
+        if not self.api_key:
+            logger.error("❌ Failed to initialize Pinecone: PINECONE_API_KEY not found in environment variables")
+            raise ValueError("PINECONE_API_KEY not found in environment variables")
         
+        # Client and index are created on first use to keep startup free of API calls
         self.pc = None
-        self.index = None
-        self._initialize_pinecone()
+        self._index = None
+        self._init_lock = threading.Lock()
+    
+    @property
+    def index(self):
+        """Pinecone index handle, connecting (and creating the index) on first access"""
+        if self._index is None:
+            self._ensure_ready()
+        return self._index
+    
+    def _ensure_ready(self):
+        """Initialize Pinecone exactly once, even under concurrent first use"""
+        with self._init_lock:
+            if self._index is None:
+                self._initialize_pinecone()
     
     def _initialize_pinecone(self):
         """Initialize Pinecone client and index"""
         try:
-            if not self.api_key:
-                raise ValueError("PINECONE_API_KEY not found in environment variables")
-            
-            # Initialize Pinecone
-            self.pc = Pinecone(api_key=self.api_key)
+            # Initialize Pinecone (gRPC transport sends vectors as protobuf, not JSON)
+            self.pc = PineconeGRPC(api_key=self.api_key)
             logger.info("✅ Pinecone client initialized successfully")
             
             # Create or connect to index
@@ -56,22 +93,27 @@ class PineconeService:
                     )
                 )
                 
-                # Wait for index to be ready
+                # Wait for index to be ready, polling instead of a fixed sleep
                 logger.info("⏳ Waiting for index to be ready...")
-                time.sleep(10)  # Give it some time to initialize
+                deadline = time.monotonic() + 60
+                while not self.pc.describe_index(self.index_name).status.ready:
+                    if time.monotonic() >= deadline:
+                        logger.warning(f"⚠️ Index {self.index_name} not ready after 60s, continuing")
+                        break
+                    time.sleep(0.5)
                 
                 logger.info(f"✅ Index {self.index_name} created successfully")
             else:
                 logger.info(f"✅ Connected to existing index: {self.index_name}")
             
             # Connect to the index
-            self.index = self.pc.Index(self.index_name)
+            self._index = self.pc.Index(self.index_name)
             
         except Exception as e:
             logger.error(f"❌ Error setting up Pinecone index: {str(e)}")
             raise
     
-    def upsert_resume(self, resume_id: str, embedding: List[float], metadata: Dict[str, Any]):
+    def upsert_resume(self, resume_id: str, embedding: Union[np.ndarray, List[float]], metadata: Dict[str, Any]):
         """
         Upsert a resume embedding with metadata to Pinecone
         
@@ -84,12 +126,13 @@ class PineconeService:
             # Prepare vector for upsert
             vector = {
                 'id': resume_id,
-                'values': embedding,
+                'values': _to_values(embedding),
                 'metadata': metadata
             }
             
             # Upsert to Pinecone
             self.index.upsert(vectors=[vector])
+            self.query_cache.clear()
             logger.info(f"✅ Resume {resume_id} upserted to Pinecone successfully")
             
         except Exception as e:
@@ -105,9 +148,12 @@ class PineconeService:
             batch_size: Number of vectors to upsert in each batch
         """
         try:
+            resumes = self._filter_new_resumes(resumes)
             total_resumes = len(resumes)
             logger.info(f"📦 Starting batch upsert of {total_resumes} resumes")
             
+            # Build every batch up front so the workers only do network I/O
+            batches = []
             for i in range(0, total_resumes, batch_size):
                 batch = resumes[i:i + batch_size]
                 
@@ -116,23 +162,68 @@ class PineconeService:
                 for resume in batch:
                     vector = {
                         'id': resume['id'],
-                        'values': resume['embedding'],
+                        'values': _to_values(resume['embedding']),
                         'metadata': resume['metadata']
                     }
                     vectors.append(vector)
                 
-                # Upsert batch
-                self.index.upsert(vectors=vectors)
-                logger.info(f"✅ Batch {i//batch_size + 1}/{(total_resumes-1)//batch_size + 1} upserted successfully")
+                batches.append(vectors)
             
+            # Plain synchronous upserts on a bounded pool; the gRPC index has no async_req
+            total_batches = len(batches)
+            if batches:
+                with ThreadPoolExecutor(max_workers=min(total_batches, self.upsert_max_workers)) as executor:
+                    futures = [executor.submit(self.index.upsert, vectors=vectors) for vectors in batches]
+                    for batch_num, future in enumerate(futures, start=1):
+                        future.result()
+                        logger.info(f"✅ Batch {batch_num}/{total_batches} upserted successfully")
+            
+            with self._known_ids_lock:
+                for resume in resumes:
+                    self._known_ids.add(resume['id'])
+            
+            self.query_cache.clear()
             logger.info(f"🎉 All {total_resumes} resumes upserted successfully")
             
         except Exception as e:
             logger.error(f"❌ Error in batch upsert: {str(e)}")
             raise
     
-    def search_similar_resumes(self, query_embedding: List[float], top_k: int = 10, 
-                             filter_metadata: Optional[Dict] = None) -> List[Dict]:
+    def _filter_new_resumes(self, resumes: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop resumes whose ID is already stored in the index
+        
+        Args:
+            resumes: List of resume dictionaries with id, embedding, and metadata
+            
+        Returns:
+            Resumes that still need to be upserted, de-duplicated by ID
+        """
+        # Resume IDs encode file name and content hashes, so equal IDs are equal resumes
+        unique_resumes = list({resume['id']: resume for resume in resumes}.values())
+        
+        with self._known_ids_lock:
+            maybe_known = [resume['id'] for resume in unique_resumes if resume['id'] in self._known_ids]
+        
+        if not maybe_known:
+            return unique_resumes
+        
+        # Bloom filter hits may be false positives or since-deleted vectors; confirm them
+        existing_ids = set()
+        for i in range(0, len(maybe_known), 100):
+            response = self.index.fetch(ids=maybe_known[i:i + 100])
+            existing_ids.update(response.vectors.keys())
+        
+        new_resumes = [resume for resume in unique_resumes if resume['id'] not in existing_ids]
+        skipped = len(resumes) - len(new_resumes)
+        if skipped:
+            logger.info(f"⏭️ Skipping {skipped} resumes already in the index")
+        
+        return new_resumes
+    
+    def search_similar_resumes(self, query_embedding: Union[np.ndarray, List[float]], top_k: int = 10, 
+                             filter_metadata: Optional[Dict] = None,
+                             return_metadata: bool = True) -> List[Dict]:
         """
         Search for similar resumes based on query embedding
         
@@ -140,16 +231,25 @@ class PineconeService:
             query_embedding: Vector embedding of the job description
             top_k: Number of top results to return
             filter_metadata: Optional metadata filters
+            return_metadata: Include resume metadata; pass False for ranking passes
+                that only need IDs and scores, then use fetch_resume_metadata
+                for the finalists
             
         Returns:
-            List of matching resumes with scores and metadata
+            List of matching resumes with scores (and metadata if requested)
         """
         try:
+            # Serve near-duplicate queries with the same parameters from the cache
+            cache_key = (top_k, json.dumps(filter_metadata, sort_keys=True), return_metadata)
+            cached_matches = self.query_cache.get(query_embedding, cache_key)
+            if cached_matches is not None:
+                return cached_matches
+            
             # Perform vector search
             search_results = self.index.query(
-                vector=query_embedding,
+                vector=_to_values(query_embedding),
                 top_k=top_k,
-                include_metadata=True,
+                include_metadata=return_metadata,
                 include_values=False,
                 filter=filter_metadata
             )
@@ -159,11 +259,14 @@ class PineconeService:
             for match in search_results.matches:
                 result = {
                     'id': match.id,
-                    'score': float(match.score),
-                    'metadata': dict(match.metadata)
+                    'score': float(match.score)
                 }
+                if return_metadata:
+                    result['metadata'] = dict(match.metadata)
                 matches.append(result)
             
+            self.query_cache.put(query_embedding, matches, cache_key)
+            
             logger.info(f"🔍 Found {len(matches)} matching resumes")
             return matches
             
@@ -171,6 +274,62 @@ class PineconeService:
             logger.error(f"❌ Error searching resumes: {str(e)}")
             raise
     
+    def search_similar_resumes_batch(self, query_embeddings: List[List[float]], top_k: int = 10,
+                                     filter_metadata: Optional[Dict] = None,
+                                     return_metadata: bool = True) -> List[List[Dict]]:
+        """
+        Search for similar resumes for several query embeddings at once
+        
+        Args:
+            query_embeddings: Vector embeddings of the job descriptions
+            top_k: Number of top results to return per query
+            filter_metadata: Optional metadata filters applied to every query
+            return_metadata: Include resume metadata in each result
+            
+        Returns:
+            One list of matching resumes per query embedding, in input order
+        """
+        if not query_embeddings:
+            return []
+        
+        try:
+            # The serverless query endpoint takes one vector, so overlap the round trips
+            with ThreadPoolExecutor(max_workers=min(len(query_embeddings), 16)) as executor:
+                results = list(executor.map(
+                    lambda embedding: self.search_similar_resumes(embedding, top_k, filter_metadata, return_metadata),
+                    query_embeddings
+                ))
+            
+            logger.info(f"🔍 Completed batch search for {len(query_embeddings)} queries")
+            return results
+            
+        except Exception as e:
+            logger.error(f"❌ Error in batch resume search: {str(e)}")
+            raise
+    
+    def fetch_resume_metadata(self, resume_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch metadata for specific resumes, e.g. the finalists of an ID-only search
+        
+        Args:
+            resume_ids: IDs of the resumes to fetch
+            
+        Returns:
+            Mapping of resume ID to metadata for the IDs found in the index
+        """
+        try:
+            metadata = {}
+            for i in range(0, len(resume_ids), 100):
+                response = self.index.fetch(ids=resume_ids[i:i + 100])
+                for resume_id, vector in response.vectors.items():
+                    metadata[resume_id] = dict(vector.metadata)
+            
+            return metadata
+            
+        except Exception as e:
+            logger.error(f"❌ Error fetching resume metadata: {str(e)}")
+            raise
+    
     def delete_resume(self, resume_id: str):
         """
         Delete a resume from Pinecone index
@@ -180,6 +339,7 @@ class PineconeService:
         """
         try:
             self.index.delete(ids=[resume_id])
+            self.query_cache.clear()
             logger.info(f"🗑️ Resume {resume_id} deleted successfully")
             
         except Exception as e:
@@ -211,6 +371,9 @@ class PineconeService:
         """
         try:
             self.index.delete(delete_all=True)
+            self.query_cache.clear()
+            with self._known_ids_lock:
+                self._known_ids = BloomFilter(capacity=1_000_000, error_rate=0.001)
             logger.warning("🧹 All vectors cleared from index")
             
         except Exception as e:
@@ -0,0 +1,241 @@
+import os
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional
+import numpy as np
+import orjson
+from utils.logger_config import setup_logging
+
+logger = setup_logging()
+
+class ResumeCache:
+    """Persistent SQLite cache of processed resumes keyed by file content hash"""
+    
+    def __init__(self, db_path: Optional[str] = None):
+        self.db_path = db_path or os.getenv('RESUME_CACHE_PATH', './cache/resume_cache.db')
+        
+        # Connection is shared across executor threads, so serialize access. It is
+        # opened on first use so importing the app never touches the filesystem
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disabled = False
+    
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """
+        Return the open connection, creating the database on first use
+        
+        Must be called with self._lock held. If the database cannot be opened
+        (e.g. a read-only filesystem), caching is disabled and None is returned.
+        """
+        if self._conn is not None or self._disabled:
+            return self._conn
+        
+        try:
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS resume_cache (
+                    content_md5 TEXT PRIMARY KEY,
+                    embedding BLOB,
+                    metadata JSON,
+                    full_text TEXT,
+                    parsed_data JSON,
+                    created_at INT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS parsed_cache (
+                    text_md5 TEXT PRIMARY KEY,
+                    parsed_data JSON,
+                    created_at INT
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS resume_data_cache (
+                    content_sha256 TEXT PRIMARY KEY,
+                    resume_data JSON,
+                    created_at INT
+                )
+            """)
+            conn.commit()
+            self._conn = conn
+        
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"⚠️ Resume cache unavailable at {self.db_path}, continuing without it: {str(e)}")
+            self._disabled = True
+        
+        return self._conn
+    
+    def close(self):
+        """Close the database connection; it is reopened if the cache is used again"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    def get(self, content_md5: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a processed resume by content hash
+        
+        Args:
+            content_md5: MD5 hex digest of the file content
+        
+        Returns:
+            Cached resume data, or None on a miss
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT embedding, metadata, full_text, parsed_data FROM resume_cache WHERE content_md5 = ?",
+                    (content_md5,)
+                ).fetchone()
+            
+            if row is None:
+                return None
+            
+            embedding_blob, metadata, full_text, parsed_data = row
+            return {
+                'embedding': np.frombuffer(embedding_blob, dtype=np.float32),
+                'metadata': orjson.loads(metadata),
+                'full_text': full_text,
+                'parsed_data': orjson.loads(parsed_data)
+            }
+        
+        except Exception as e:
+            logger.warning(f"⚠️ Resume cache lookup failed: {str(e)}")
+            return None
+    
+    def put(self, content_md5: str, resume: Dict[str, Any]):
+        """
+        Store a processed resume under its content hash
+        
+        Args:
+            content_md5: MD5 hex digest of the file content
+            resume: Processed resume with embedding, metadata, full_text and parsed_data
+        """
+        try:
+            # Packed float32 is ~6KB per 1536-dim vector vs ~20KB as JSON
+            embedding_blob = np.asarray(resume['embedding'], dtype=np.float32).tobytes()
+            
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO resume_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        content_md5,
+                        embedding_blob,
+                        orjson.dumps(resume['metadata']),
+                        resume['full_text'],
+                        orjson.dumps(resume['parsed_data']),
+                        int(time.time())
+                    )
+                )
+                conn.commit()
+        
+        except Exception as e:
+            logger.warning(f"⚠️ Resume cache write failed: {str(e)}")
+    
+    def get_parsed(self, text_md5: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up parsed resume data by resume text hash
+        
+        Args:
+            text_md5: MD5 hex digest of the extracted resume text
+        
+        Returns:
+            Parsed resume data, or None on a miss
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT parsed_data FROM parsed_cache WHERE text_md5 = ?",
+                    (text_md5,)
+                ).fetchone()
+            
+            return orjson.loads(row[0]) if row else None
+        
+        except Exception as e:
+            logger.warning(f"⚠️ Parsed data cache lookup failed: {str(e)}")
+            return None
+    
+    def put_parsed(self, text_md5: str, parsed_data: Dict[str, Any]):
+        """
+        Store parsed resume data under its resume text hash
+        
+        Args:
+            text_md5: MD5 hex digest of the extracted resume text
+            parsed_data: Structured resume data returned by the LLM parse
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO parsed_cache VALUES (?, ?, ?)",
+                    (text_md5, orjson.dumps(parsed_data), int(time.time()))
+                )
+                conn.commit()
+        
+        except Exception as e:
+            logger.warning(f"⚠️ Parsed data cache write failed: {str(e)}")
+    
+    def get_resume_data(self, content_sha256: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up heuristically parsed resume data by uploaded PDF hash
+        
+        Args:
+            content_sha256: SHA-256 hex digest of the PDF content, prefixed with
+                the parser version that produced the data
+        
+        Returns:
+            Resume data fields, or None on a miss
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT resume_data FROM resume_data_cache WHERE content_sha256 = ?",
+                    (content_sha256,)
+                ).fetchone()
+            
+            return orjson.loads(row[0]) if row else None
+        
+        except Exception as e:
+            logger.warning(f"⚠️ Resume data cache lookup failed: {str(e)}")
+            return None
+    
+    def put_resume_data(self, content_sha256: str, resume_data: Dict[str, Any]):
+        """
+        Store heuristically parsed resume data under its uploaded PDF hash
+        
+        Args:
+            content_sha256: SHA-256 hex digest of the PDF content, prefixed with
+                the parser version that produced the data
+            resume_data: Resume data fields produced by ResumeParser
+        """
+        try:
+            with self._lock:
+                conn = self._connect()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO resume_data_cache VALUES (?, ?, ?)",
+                    (content_sha256, orjson.dumps(resume_data), int(time.time()))
+                )
+                conn.commit()
+        
+        except Exception as e:
+            logger.warning(f"⚠️ Resume data cache write failed: {str(e)}")
@@ -1,21 +1,62 @@
 import io
 import os
-import json
+import copy
+import re
 import hashlib
-from typing import Dict, Any, List, Optional
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import fitz
 import pdfplumber
-import PyPDF2
 from docx import Document
-from openai import OpenAI
+import numpy as np
+import orjson
+import httpx
+from openai import OpenAI, DefaultHttpxClient
+from cachetools import TTLCache, LRUCache
+from services.resume_cache import ResumeCache
 from utils.logger_config import setup_logging
 
 logger = setup_logging()
+
+# Patterns used by _clean_text, compiled once at import
+_WS_RE = re.compile(r'\s+')
+_BLANK_LINE_RE = re.compile(r'\n\s*\n')
+_SPECIAL_RE = re.compile(r'[^\w\s\n.,;:()\-@]')
+
 class ResumeEmbeddingService:
     """Service for processing resumes and generating embeddings"""
     
     def __init__(self):
-        self.openai_client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # Long-lived pooled HTTP client so repeated calls reuse keep-alive connections;
+        # DefaultHttpxClient keeps the SDK's timeout and redirect defaults
+        self.openai_client = OpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            http_client=DefaultHttpxClient(
+                limits=httpx.Limits(max_keepalive_connections=32, max_connections=64)
+            )
+        )
         self.embedding_model = "text-embedding-ada-002"
+        
+        # Query embedding cache keyed by SHA-256 of the input text
+        self._embedding_cache = TTLCache(maxsize=1024, ttl=3600)
+        self._embedding_cache_lock = threading.Lock()
+        
+        # Persistent cache of fully processed resumes keyed by content hash
+        self.resume_cache = ResumeCache()
+        
+        # Bounded in-process cache of LLM-parsed resume data keyed by MD5 of the resume text
+        self._parsed_cache = LRUCache(maxsize=512)
+        self._parsed_cache_lock = threading.Lock()
+        
+        # Shared pool for GPT parses that overlap with embedding calls in process_resume
+        self._parse_executor = ThreadPoolExecutor(max_workers=8)
+    
+    def close(self):
+        """Release the pooled OpenAI HTTP connections, parse worker threads and resume cache"""
+        self.openai_client.close()
+        self._parse_executor.shutdown(wait=False)
+        self.resume_cache.close()
     
     def extract_text_from_pdf(self, pdf_content: bytes) -> str:
         """
@@ -28,39 +69,30 @@ class ResumeEmbeddingService:
             Extracted text string
         """
         try:
-            text = ""
-            
-            # Method 1: Try pdfplumber first (better for complex layouts)
+            # Method 1: PyMuPDF (native MuPDF bindings, much faster than pure-Python parsers)
             try:
-                with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                
-                if text.strip():
-                    logger.info("✅ Text extracted using pdfplumber")
-                    return self._clean_text(text)
+                with fitz.open(stream=pdf_content, filetype="pdf") as doc:
+                    # Sniff the first page; an empty text layer means a scanned PDF,
+                    # so skip the remaining pages and go straight to the fallback
+                    first_page_text = doc[0].get_text("text") if doc.page_count else ""
+                    if first_page_text.strip():
+                        text = "\n".join(
+                            [first_page_text] + [doc[i].get_text("text") for i in range(1, doc.page_count)]
+                        )
+                        logger.info("✅ Text extracted using PyMuPDF")
+                        return self._clean_text(text)
             except Exception as e:
-                logger.warning(f"⚠️ pdfplumber failed: {str(e)}")
+                logger.warning(f"⚠️ PyMuPDF failed: {str(e)}")
             
-            # Method 2: Fallback to PyPDF2
-            try:
-                pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-                for page in pdf_reader.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                
-                if text.strip():
-                    logger.info("✅ Text extracted using PyPDF2")
-                    return self._clean_text(text)
-            except Exception as e:
-                logger.warning(f"⚠️ PyPDF2 failed: {str(e)}")
+            # Method 2: Fallback to pdfplumber for PDFs without a usable text layer
+            with pdfplumber.open(io.BytesIO(pdf_content)) as pdf:
+                page_texts = [page.extract_text() for page in pdf.pages]
+            text = "\n".join([page_text for page_text in page_texts if page_text])
             
-            # If both methods fail
+            if not text.strip():
                 raise Exception("Could not extract text from PDF using any method")
             
+            logger.info("✅ Text extracted using pdfplumber")
             return self._clean_text(text)
             
         except Exception as e:
@@ -112,14 +144,12 @@ class ResumeEmbeddingService:
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize extracted text"""
-        import re
-        
         # Remove extra whitespace and normalize line breaks
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n\s*\n', '\n', text)
+        text = _WS_RE.sub(' ', text)
+        text = _BLANK_LINE_RE.sub('\n', text)
         
         # Remove special characters that might interfere
-        text = re.sub(r'[^\w\s\n.,;:()\-@]', '', text)
+        text = _SPECIAL_RE.sub('', text)
         
         return text.strip()
     
@@ -131,8 +161,16 @@ class ResumeEmbeddingService:
             text: Raw resume text
             
         Returns:
-            Structured resume data dictionary
+            Structured resume data dictionary; if the LLM call fails, a basic
+            structure marked with '_fallback': True
         """
+        # Identical text always parses the same way, so skip the LLM call on a hit
+        text_hash = hashlib.md5(text.encode()).hexdigest()
+        cached = self._get_cached_parse(text_hash)
+        if cached is not None:
+            logger.info(f"⚡ Parsed data cache hit for: {cached.get('name', 'Unknown')}")
+            return cached
+        
         try:
             # Create a prompt for OpenAI to extract structured data
             prompt = f"""
@@ -168,8 +206,7 @@ class ResumeEmbeddingService:
             )
             
             # Parse the JSON response
-            import json
-            parsed_data = json.loads(response.choices[0].message.content)
+            parsed_data = orjson.loads(response.choices[0].message.content)
             
             # Ensure all fields exist with defaults
             default_data = {
@@ -190,13 +227,16 @@ class ResumeEmbeddingService:
                 if key not in parsed_data or not parsed_data[key]:
                     parsed_data[key] = default_value
             
+            self._store_cached_parse(text_hash, parsed_data)
+            
             logger.info(f"✅ Resume parsed successfully for: {parsed_data.get('name', 'Unknown')}")
             return parsed_data
             
         except Exception as e:
             logger.error(f"❌ Error parsing resume content: {str(e)}")
-            # Return basic structure if parsing fails
+            # Return basic structure if parsing fails; '_fallback' keeps it out of every cache
             return {
+                "_fallback": True,
                 "name": "Unknown",
                 "email": "",
                 "phone": "",
@@ -209,7 +249,28 @@ class ResumeEmbeddingService:
                 "summary": text[:500] if text else ""
             }
     
-    def generate_embedding(self, text: str) -> List[float]:
+    def _get_cached_parse(self, text_hash: str) -> Optional[Dict[str, Any]]:
+        """Return a private copy of cached parsed data, checking memory then SQLite"""
+        with self._parsed_cache_lock:
+            cached = self._parsed_cache.get(text_hash)
+        
+        if cached is None:
+            cached = self.resume_cache.get_parsed(text_hash)
+            if cached is None:
+                return None
+            with self._parsed_cache_lock:
+                self._parsed_cache[text_hash] = cached
+        
+        # Callers mutate the returned dict, so never hand out the cached object
+        return copy.deepcopy(cached)
+    
+    def _store_cached_parse(self, text_hash: str, parsed_data: Dict[str, Any]):
+        """Store a private copy of parsed data in memory and in SQLite"""
+        with self._parsed_cache_lock:
+            self._parsed_cache[text_hash] = copy.deepcopy(parsed_data)
+        self.resume_cache.put_parsed(text_hash, parsed_data)
+    
+    def generate_embedding(self, text: str) -> np.ndarray:
         """
         Generate OpenAI embedding for the given text
         
@@ -217,7 +278,7 @@ class ResumeEmbeddingService:
             text: Text to embed
             
         Returns:
-            Embedding vector as list of floats
+            Embedding vector as a float32 array
         """
         try:
             # Truncate text if too long (OpenAI has token limits)
@@ -225,83 +286,170 @@ class ResumeEmbeddingService:
             if len(text) > max_chars:
                 text = text[:max_chars]
             
-            response = self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=text
-            )
-            
-            embedding = response.data[0].embedding
-            logger.info(f"✅ Generated embedding with {len(embedding)} dimensions")
-            
-            return embedding
+            text_hash = hashlib.sha256(text.encode()).hexdigest()
+            return self._embed_cached(text_hash, text)
             
         except Exception as e:
             logger.error(f"❌ Error generating embedding: {str(e)}")
             raise
     
-    def create_resume_embedding_text(self, parsed_data: Dict[str, Any], full_text: str) -> str:
+    def generate_embeddings_batch(self, texts: List[str], batch_size: int = 96) -> List[np.ndarray]:
         """
-        Create optimized text for embedding that combines structured data with full text
+        Generate OpenAI embeddings for many texts using one request per chunk
         
         Args:
-            parsed_data: Structured resume data
-            full_text: Full resume text
+            texts: Texts to embed
+            batch_size: Number of inputs sent per embeddings request
             
         Returns:
-            Optimized text for embedding
+            Float32 embedding vectors in the same order as texts
         """
-        # Create a structured representation for better matching
-        embedding_text_parts = []
-        
-        # Add structured information
-        if parsed_data.get('name'):
-            embedding_text_parts.append(f"Name: {parsed_data['name']}")
-        
-        if parsed_data.get('summary'):
-            embedding_text_parts.append(f"Summary: {parsed_data['summary']}")
-        
-        if parsed_data.get('skills'):
-            skills_text = ", ".join(parsed_data['skills'])
-            embedding_text_parts.append(f"Skills: {skills_text}")
-        
-        if parsed_data.get('job_titles'):
-            titles_text = ", ".join(parsed_data['job_titles'])
-            embedding_text_parts.append(f"Job Titles: {titles_text}")
-        
-        if parsed_data.get('companies'):
-            companies_text = ", ".join(parsed_data['companies'])
-            embedding_text_parts.append(f"Companies: {companies_text}")
+        try:
+            # Truncate text if too long (OpenAI has token limits)
+            max_chars = 8000  # Approximately 2000 tokens
+            texts = [text[:max_chars] for text in texts]
+            
+            embeddings = []
+            for i in range(0, len(texts), batch_size):
+                chunk = texts[i:i + batch_size]
+                response = self.openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=chunk
+                )
+                
+                # Results carry their input position; keep the caller's order
+                for item in sorted(response.data, key=lambda item: item.index):
+                    embeddings.append(np.asarray(item.embedding, dtype=np.float32))
+            
+            logger.info(f"✅ Generated {len(embeddings)} embeddings in {(len(texts) - 1) // batch_size + 1} requests")
+            return embeddings
+            
+        except Exception as e:
+            logger.error(f"❌ Error generating batch embeddings: {str(e)}")
+            raise
+    
+    def _embed_cached(self, text_hash: str, text: str) -> np.ndarray:
+        """Return the cached embedding for text_hash, calling OpenAI only on a miss"""
+        with self._embedding_cache_lock:
+            cached = self._embedding_cache.get(text_hash)
+        if cached is not None:
+            logger.info("⚡ Embedding cache hit")
+            return cached.copy()
         
-        if parsed_data.get('education'):
-            education_text = ", ".join(parsed_data['education'])
-            embedding_text_parts.append(f"Education: {education_text}")
+        response = self.openai_client.embeddings.create(
+            model=self.embedding_model,
+            input=text
+        )
         
-        if parsed_data.get('experience_years'):
-            embedding_text_parts.append(f"Experience: {parsed_data['experience_years']} years")
+        # Keep embeddings as flat float32 arrays (~6KB) rather than lists of Python floats
+        embedding = np.asarray(response.data[0].embedding, dtype=np.float32)
+        logger.info(f"✅ Generated embedding with {len(embedding)} dimensions")
         
-        # Combine structured data with full text
-        structured_text = "\n".join(embedding_text_parts)
-        combined_text = f"{structured_text}\n\nFull Resume:\n{full_text}"
+        with self._embedding_cache_lock:
+            self._embedding_cache[text_hash] = embedding
         
-        return combined_text
+        return embedding.copy()
     
-    def generate_resume_id(self, file_name: str, file_content: bytes) -> str:
+    def generate_resume_id(self, file_name: str, file_content: bytes, content_md5: Optional[str] = None) -> str:
         """
         Generate a unique ID for the resume based on filename and content
         
         Args:
             file_name: Name of the resume file
             file_content: File content bytes
+            content_md5: Precomputed MD5 hex digest of file_content, if available
             
         Returns:
             Unique resume ID
         """
         # Create hash from filename and content
-        content_hash = hashlib.md5(file_content).hexdigest()
+        content_hash = content_md5 or hashlib.md5(file_content).hexdigest()
         name_hash = hashlib.md5(file_name.encode()).hexdigest()
         
         return f"resume_{name_hash[:8]}_{content_hash[:8]}"
     
+    def _prepare_resume(self, file_name: str, file_content: bytes, drive_url: str) -> Dict[str, Any]:
+        """
+        Run the pre-LLM stages of the pipeline (cache lookup and text extraction)
+        
+        Args:
+            file_name: Name of the resume file
+            file_content: PDF or DOCX content as bytes
+            drive_url: Google Drive shareable URL
+            
+        Returns:
+            Resume data; cache hits already carry an 'embedding', misses carry
+            the extracted 'full_text' still to be parsed and embedded
+        """
+        # Hash the content once; the ID and both cache keys share these digests
+        content_md5 = hashlib.md5(file_content).hexdigest()
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        resume_id = self.generate_resume_id(file_name, file_content, content_md5)
+        
+        # Short-circuit extraction, parsing and embedding for known content
+        cached = self.resume_cache.get(content_md5)
+        if cached:
+            cached['metadata']['drive_url'] = drive_url
+            cached['metadata']['file_name'] = file_name
+            cached['metadata']['content_hash'] = content_hash
+            logger.info(f"⚡ Resume cache hit for: {file_name}")
+            return {'id': resume_id, **cached}
+        
+        # Extract text based on file type
+        file_extension = file_name.lower().split('.')[-1]
+        if file_extension == 'pdf':
+            full_text = self.extract_text_from_pdf(file_content)
+        elif file_extension in ['docx', 'doc']:
+            full_text = self.extract_text_from_docx(file_content)
+        else:
+            raise ValueError(f"Unsupported file type: {file_extension}")
+        
+        if not full_text.strip():
+            raise ValueError("No text could be extracted from the file")
+        
+        return {
+            'id': resume_id,
+            'content_md5': content_md5,
+            'content_hash': content_hash,
+            'file_name': file_name,
+            'drive_url': drive_url,
+            'full_text': full_text
+        }
+    
+    def _finalize_resume(self, prepared: Dict[str, Any], parsed_data: Dict[str, Any],
+                         embedding: np.ndarray) -> Dict[str, Any]:
+        """Combine a prepared resume with its parse and embedding, and store it in the resume cache"""
+        is_fallback = parsed_data.pop('_fallback', False)
+        
+        # Prepare metadata for Pinecone
+        metadata = {
+            'name': parsed_data['name'],
+            'email': parsed_data['email'],
+            'phone': parsed_data['phone'],
+            'skills': parsed_data['skills'][:20],  # Limit for metadata size
+            'experience_years': parsed_data['experience_years'],
+            'job_titles': parsed_data['job_titles'][:10],
+            'companies': parsed_data['companies'][:10],
+            'education': parsed_data['education'][:5],
+            'drive_url': prepared['drive_url'],
+            'file_name': prepared['file_name'],
+            'content_hash': prepared['content_hash'],  # SHA-256 of the file, for change detection
+            'summary': parsed_data['summary'][:500]  # Truncate for metadata
+        }
+        
+        result = {
+            'id': prepared['id'],
+            'embedding': embedding,
+            'metadata': metadata,
+            'full_text': prepared['full_text'],
+            'parsed_data': parsed_data
+        }
+        
+        # A fallback parse would otherwise be served for this file forever
+        if not is_fallback:
+            self.resume_cache.put(prepared['content_md5'], result)
+        return result
+    
     def process_resume(self, file_name: str, file_content: bytes, drive_url: str) -> Dict[str, Any]:
         """
         Complete resume processing pipeline
@@ -317,56 +465,81 @@ class ResumeEmbeddingService:
         try:
             logger.info(f"🔄 Processing resume: {file_name}")
             
-            # Generate unique ID
-            resume_id = self.generate_resume_id(file_name, file_content)
+            prepared = self._prepare_resume(file_name, file_content, drive_url)
+            if 'embedding' in prepared:
+                return prepared
             
-            # Extract text based on file type
-            file_extension = file_name.lower().split('.')[-1]
-            if file_extension == 'pdf':
-                full_text = self.extract_text_from_pdf(file_content)
-            elif file_extension in ['docx', 'doc']:
-                full_text = self.extract_text_from_docx(file_content)
-            else:
-                raise ValueError(f"Unsupported file type: {file_extension}")
-            
-            if not full_text.strip():
-                raise ValueError("No text could be extracted from the file")
-            
-            # Parse structured data
-            parsed_data = self.parse_resume_content(full_text)
-            
-            # Create optimized text for embedding
-            embedding_text = self.create_resume_embedding_text(parsed_data, full_text)
-            
-            # Generate embedding
-            embedding = self.generate_embedding(embedding_text)
-            
-            # Prepare metadata for Pinecone
-            metadata = {
-                'name': parsed_data['name'],
-                'email': parsed_data['email'],
-                'phone': parsed_data['phone'],
-                'skills': parsed_data['skills'][:20],  # Limit for metadata size
-                'experience_years': parsed_data['experience_years'],
-                'job_titles': parsed_data['job_titles'][:10],
-                'companies': parsed_data['companies'][:10],
-                'education': parsed_data['education'][:5],
-                'drive_url': drive_url,
-                'file_name': file_name,
-                'summary': parsed_data['summary'][:500]  # Truncate for metadata
-            }
+            # The embedding is built from the full text, so it doesn't wait on the
+            # GPT parse; run both OpenAI calls concurrently
+            full_text = prepared['full_text']
+            parse_future = self._parse_executor.submit(self.parse_resume_content, full_text)
+            embedding = self.generate_embedding(full_text)
+            parsed_data = parse_future.result()
             
-            result = {
-                'id': resume_id,
-                'embedding': embedding,
-                'metadata': metadata,
-                'full_text': full_text,
-                'parsed_data': parsed_data
-            }
+            result = self._finalize_resume(prepared, parsed_data, embedding)
             
-            logger.info(f"✅ Resume processing completed for: {parsed_data['name']}")
+            logger.info(f"✅ Resume processing completed for: {result['metadata']['name']}")
             return result
             
         except Exception as e:
             logger.error(f"❌ Error processing resume {file_name}: {str(e)}")
             raise
+    
+    def process_resumes_batch(self, files: List[Tuple[str, bytes, str]], max_workers: int = 5) -> List[Dict[str, Any]]:
+        """
+        Process several resumes, embedding all of them with batched OpenAI calls
+        
+        Args:
+            files: List of (file_name, file_content, drive_url) tuples
+            max_workers: Threads used for text extraction and GPT parsing
+            
+        Returns:
+            List aligned with files holding the processed resume, or the
+            exception raised while processing that file
+        """
+        logger.info(f"🔄 Processing batch of {len(files)} resumes")
+        
+        def prepare(file_info):
+            try:
+                return self._prepare_resume(*file_info)
+            except Exception as e:
+                logger.error(f"❌ Error processing resume {file_info[0]}: {str(e)}")
+                return e
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(prepare, files))
+            
+            pending = [
+                i for i, prepared in enumerate(results)
+                if not isinstance(prepared, Exception) and 'embedding' not in prepared
+            ]
+            
+            if pending:
+                # GPT parses run on the pool while the batched embedding call runs here
+                parse_futures = [
+                    executor.submit(self.parse_resume_content, results[i]['full_text'])
+                    for i in pending
+                ]
+                
+                # One batched request embeds every pending resume, so if it fails they all do
+                embedding_error = None
+                try:
+                    embeddings = self.generate_embeddings_batch(
+                        [results[i]['full_text'] for i in pending]
+                    )
+                except Exception as e:
+                    embedding_error = e
+                    embeddings = [None] * len(pending)
+                
+                # Record failures per resume so one bad parse never discards finished results
+                for i, parse_future, embedding in zip(pending, parse_futures, embeddings):
+                    try:
+                        if embedding_error is not None:
+                            raise embedding_error
+                        results[i] = self._finalize_resume(results[i], parse_future.result(), embedding)
+                    except Exception as e:
+                        logger.error(f"❌ Error processing resume {results[i]['file_name']}: {str(e)}")
+                        results[i] = e
+        
+        logger.info(f"✅ Batch processing completed for {len(files)} resumes")
+        return results
@@ -1,17 +1,39 @@
-import requests
+import aiohttp
+import asyncio
 import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from urllib.parse import urlparse, parse_qs
-import tempfile
 import os
 from docx import Document
-import PyPDF2
+import fitz
 from io import BytesIO
 from bs4 import BeautifulSoup
+from lxml import html as lxml_html, etree
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 from utils.logger_config import setup_logging
 
 logger = setup_logging()
 
+# Collapses all whitespace runs in extracted text to single spaces
+_WS_RE = re.compile(r"\s+")
+
+# Google Docs / Drive URL patterns and direct-download file extensions
+_DOC_ID_RE = re.compile(r'/document/d/([a-zA-Z0-9-_]+)')
+_DRIVE_FILE_RE = re.compile(r'/file/d/([a-zA-Z0-9-_]+)')
+_FILE_EXTS = ('.pdf', '.docx', '.doc', '.txt')
+
+# Content types that may hold a resume; anything else is rejected before download
+_RESUME_CONTENT_TYPES = ('pdf', 'word', 'text', 'html', 'octet-stream')
+
+# Transient upstream failures worth retrying
+_RETRY_STATUSES = frozenset({502, 503, 504})
+
+def _is_retryable(error: BaseException) -> bool:
+    """Retry gateway errors and dropped connections, but not timeouts or client errors"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status in _RETRY_STATUSES
+    return isinstance(error, aiohttp.ClientConnectionError)
+
 class ResumeExtractionResult:
     """Result of resume text extraction"""
     def __init__(self, text: str, success: bool, error: Optional[str] = None, metadata: Optional[Dict] = None):
@@ -24,10 +46,62 @@ class ResumeFetcher:
     """Service to fetch and extract text from resume URLs"""
     
     def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+        self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        }
+        self.timeout = aiohttp.ClientTimeout(total=30)
+        self.max_download_bytes = int(float(os.getenv("MAX_FILE_SIZE_MB", 20)) * 1024 * 1024)
+        # OCR of image-only PDFs needs pytesseract, Pillow and the tesseract binary
+        self.ocr_enabled = os.getenv("ENABLE_PDF_OCR", "false").lower() in ("1", "true", "yes")
+        
+        # Created on first use, since aiohttp sessions must live inside the event loop
+        self._session: Optional[aiohttp.ClientSession] = None
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the shared keep-alive session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                headers=self.headers,
+                connector=aiohttp.TCPConnector(limit=32, limit_per_host=32, keepalive_timeout=30)
+            )
+        return self._session
+    
+    @retry(
+        stop=stop_after_attempt(4),
+        wait=wait_exponential(multiplier=0.3, max=5),
+        retry=retry_if_exception(_is_retryable),
+        reraise=True
+    )
+    async def _download(self, url: str, raise_for_status: bool = True) -> Tuple[int, str, str, bytes]:
+        """
+        GET a URL over the pooled session, retrying transient gateway and connection errors
+        
+        Returns:
+            Tuple of (status code, lower-cased content type, charset, body bytes)
+        """
+        session = await self._get_session()
+        async with session.get(url, timeout=self.timeout) as response:
+            if raise_for_status or response.status in _RETRY_STATUSES:
+                response.raise_for_status()
+            
+            # Reject oversized bodies up front when the server declares a length
+            if response.content_length and response.content_length > self.max_download_bytes:
+                raise ValueError(f"File too large ({response.content_length} bytes, limit {self.max_download_bytes})")
+            
+            # Stream the body so an undeclared oversized download is cut off early
+            buffer = bytearray()
+            async for chunk in response.content.iter_chunked(65536):
+                buffer.extend(chunk)
+                if len(buffer) > self.max_download_bytes:
+                    raise ValueError(f"File too large (over {self.max_download_bytes} bytes)")
+            
+            content_type = response.headers.get('content-type', '').lower()
+            return response.status, content_type, response.charset or 'utf-8', bytes(buffer)
+    
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
     
     async def fetch_resume_text(self, resume_url: str) -> ResumeExtractionResult:
         """
@@ -70,7 +144,7 @@ class ResumeFetcher:
         """Check if URL points to a direct file download"""
         parsed = urlparse(url)
         path = parsed.path.lower()
-        return any(path.endswith(ext) for ext in ['.pdf', '.docx', '.doc', '.txt'])
+        return path.endswith(_FILE_EXTS)
     
     async def _fetch_google_docs(self, url: str) -> ResumeExtractionResult:
         """Fetch content from Google Docs"""
@@ -78,29 +152,25 @@ class ResumeFetcher:
             # Convert Google Docs URL to export format
             export_url = self._convert_to_export_url(url)
             
-            response = self.session.get(export_url, timeout=30)
+            status_code, content_type, charset, content = await self._download(export_url, raise_for_status=False)
             
-            if response.status_code == 200:
-                # Try to extract text from HTML
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
-                
-                # Get text content
-                text = soup.get_text()
-                
-                # Clean up the text
-                lines = (line.strip() for line in text.splitlines())
-                chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-                text = ' '.join(chunk for chunk in chunks if chunk)
+            if status_code == 200:
+                # Plain text exports need no parsing; fall back to HTML extraction otherwise
+                if content_type.startswith('text/plain'):
+                    # utf-8-sig drops the byte order mark Google prepends to txt exports
+                    encoding = 'utf-8-sig' if charset.lower().replace('_', '-') in ('utf-8', 'utf8') else charset
+                    decoded = content.decode(encoding, 'replace').lstrip('\ufeff')
+                    text = _WS_RE.sub(" ", decoded).strip()
+                    export_format = 'txt'
+                else:
+                    text = self._html_to_text(content)
+                    export_format = 'html'
                 
                 if len(text.strip()) > 50:  # Minimum content check
                     return ResumeExtractionResult(
                         text=text,
                         success=True,
-                        metadata={'source': 'google_docs', 'format': 'html'}
+                        metadata={'source': 'google_docs', 'format': export_format}
                     )
                 else:
                     return ResumeExtractionResult(
@@ -109,7 +179,7 @@ class ResumeFetcher:
                         error="Document appears to be empty or private. Please ensure the document is publicly accessible."
                     )
             
-            elif response.status_code == 403:
+            elif status_code == 403:
                 return ResumeExtractionResult(
                     text="",
                     success=False,
@@ -119,7 +189,7 @@ class ResumeFetcher:
                 return ResumeExtractionResult(
                     text="",
                     success=False,
-                    error=f"Failed to access Google Doc. Status code: {response.status_code}"
+                    error=f"Failed to access Google Doc. Status code: {status_code}"
                 )
                 
         except Exception as e:
@@ -132,10 +202,10 @@ class ResumeFetcher:
     def _convert_to_export_url(self, url: str) -> str:
         """Convert Google Docs URL to export format"""
         # Extract document ID from various Google Docs URL formats
-        doc_id_match = re.search(r'/document/d/([a-zA-Z0-9-_]+)', url)
+        doc_id_match = _DOC_ID_RE.search(url)
         if doc_id_match:
             doc_id = doc_id_match.group(1)
-            return f"https://docs.google.com/document/d/{doc_id}/export?format=html"
+            return f"https://docs.google.com/document/d/{doc_id}/export?format=txt"
         
         # If already an export URL, return as is
         if 'export?format=' in url:
@@ -143,34 +213,64 @@ class ResumeFetcher:
         
         # If it's a drive URL, try to convert
         if 'drive.google.com' in url:
-            file_id_match = re.search(r'/file/d/([a-zA-Z0-9-_]+)', url)
+            file_id_match = _DRIVE_FILE_RE.search(url)
             if file_id_match:
                 file_id = file_id_match.group(1)
                 return f"https://drive.google.com/uc?id={file_id}&export=download"
         
         return url
     
+    async def _check_direct_file_headers(self, url: str) -> Optional[str]:
+        """
+        HEAD a direct file URL and return a rejection reason for oversized or
+        non-resume content, or None if the body is worth downloading
+        """
+        try:
+            session = await self._get_session()
+            async with session.head(url, timeout=aiohttp.ClientTimeout(total=10), allow_redirects=True) as response:
+                if response.status >= 400:
+                    # Some servers don't support HEAD; let the GET decide
+                    return None
+                content_type = response.headers.get('content-type', '').lower()
+                content_length = response.content_length or 0
+        except Exception as e:
+            logger.warning(f"HEAD request failed for {url}: {str(e)}")
+            return None
+        
+        if content_length > self.max_download_bytes:
+            return f"File too large ({content_length} bytes, limit {self.max_download_bytes})"
+        if content_type and not any(kind in content_type for kind in _RESUME_CONTENT_TYPES):
+            return f"Unsupported content type: {content_type}"
+        return None
+    
     async def _fetch_direct_file(self, url: str) -> ResumeExtractionResult:
         """Fetch and process direct file downloads"""
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            # Skip the body download entirely for files we would reject anyway
+            rejection = await self._check_direct_file_headers(url)
+            if rejection:
+                return ResumeExtractionResult(
+                    text="",
+                    success=False,
+                    error=f"Error processing direct file: {rejection}"
+                )
             
-            content_type = response.headers.get('content-type', '').lower()
+            _, content_type, encoding, content = await self._download(url)
             
+            # Document parsing (and PDF OCR) is CPU-bound, keep it off the event loop
             if 'pdf' in content_type or url.lower().endswith('.pdf'):
-                return self._extract_pdf_text(response.content)
+                return await asyncio.to_thread(self._extract_pdf_text, content)
             elif 'word' in content_type or url.lower().endswith(('.docx', '.doc')):
-                return self._extract_docx_text(response.content)
+                return await asyncio.to_thread(self._extract_docx_text, content)
             elif 'text' in content_type or url.lower().endswith('.txt'):
                 return ResumeExtractionResult(
-                    text=response.text,
+                    text=content.decode(encoding, errors='replace'),
                     success=True,
                     metadata={'source': 'direct_file', 'format': 'text'}
                 )
             else:
                 # Try to parse as HTML
-                return self._extract_html_text(response.content)
+                return self._extract_html_text(content)
                 
         except Exception as e:
             return ResumeExtractionResult(
@@ -182,10 +282,9 @@ class ResumeFetcher:
     async def _fetch_web_page(self, url: str) -> ResumeExtractionResult:
         """Fetch content from a web page"""
         try:
-            response = self.session.get(url, timeout=30)
-            response.raise_for_status()
+            _, _, _, content = await self._download(url)
             
-            return self._extract_html_text(response.content)
+            return self._extract_html_text(content)
             
         except Exception as e:
             return ResumeExtractionResult(
@@ -197,18 +296,23 @@ class ResumeFetcher:
     def _extract_pdf_text(self, content: bytes) -> ResumeExtractionResult:
         """Extract text from PDF content"""
         try:
-            pdf_file = BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
+            # fitz.open accepts the raw bytes directly, no BytesIO wrapper needed;
+            # the with block closes the document even if OCR raises
+            with fitz.open(stream=content, filetype="pdf") as doc:
+                page_count = doc.page_count
+                text = "\n".join(page.get_text("text") for page in doc)
+                
+                # Image-only PDFs have no text layer; OCR them only when nothing was found
+                ocr_used = False
+                if not text.strip() and self.ocr_enabled:
+                    text = self._ocr_pdf_pages(doc)
+                    ocr_used = True
             
             if text.strip():
                 return ResumeExtractionResult(
                     text=text,
                     success=True,
-                    metadata={'source': 'direct_file', 'format': 'pdf', 'pages': len(pdf_reader.pages)}
+                    metadata={'source': 'direct_file', 'format': 'pdf', 'pages': page_count, 'ocr': ocr_used}
                 )
             else:
                 return ResumeExtractionResult(
@@ -224,34 +328,40 @@ class ResumeFetcher:
                 error=f"Error processing PDF: {str(e)}"
             )
     
+    def _ocr_pdf_pages(self, doc: "fitz.Document") -> str:
+        """Render each PDF page and run it through Tesseract OCR"""
+        # Imported here so the OCR dependencies are only needed when the feature is enabled
+        import pytesseract
+        from PIL import Image
+        
+        logger.info(f"🔎 No text layer found, running OCR on {doc.page_count} PDF pages")
+        ocr_parts = []
+        for page in doc:
+            pix = page.get_pixmap(dpi=200)
+            image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            ocr_parts.append(pytesseract.image_to_string(image))
+        return "\n".join(ocr_parts)
+    
     def _extract_docx_text(self, content: bytes) -> ResumeExtractionResult:
         """Extract text from DOCX content"""
         try:
-            # Save content to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as tmp_file:
-                tmp_file.write(content)
-                tmp_file.flush()
-                
-                # Read with python-docx
-                doc = Document(tmp_file.name)
-                text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                
-                # Clean up temporary file
-                os.unlink(tmp_file.name)
+            # Read with python-docx straight from memory
+            doc = Document(BytesIO(content))
+            text = "\n".join([paragraph.text for paragraph in doc.paragraphs])
+            
+            if text.strip():
+                return ResumeExtractionResult(
+                    text=text,
+                    success=True,
+                    metadata={'source': 'direct_file', 'format': 'docx'}
+                )
+            else:
+                return ResumeExtractionResult(
+                    text="",
+                    success=False,
+                    error="Could not extract text from Word document."
+                )
                 
-                if text.strip():
-                    return ResumeExtractionResult(
-                        text=text,
-                        success=True,
-                        metadata={'source': 'direct_file', 'format': 'docx'}
-                    )
-                else:
-                    return ResumeExtractionResult(
-                        text="",
-                        success=False,
-                        error="Could not extract text from Word document."
-                    )
-                    
         except Exception as e:
             return ResumeExtractionResult(
                 text="",
@@ -259,22 +369,29 @@ class ResumeFetcher:
                 error=f"Error processing Word document: {str(e)}"
             )
     
-    def _extract_html_text(self, content: bytes) -> ResumeExtractionResult:
-        """Extract text from HTML content"""
+    def _html_to_text(self, content: bytes) -> str:
+        """Strip script/style elements from HTML and return its whitespace-collapsed text"""
         try:
-            soup = BeautifulSoup(content, 'html.parser')
+            # lxml works on the C tree directly, without BeautifulSoup's per-node Python objects
+            tree = lxml_html.fromstring(content)
+            etree.strip_elements(tree, 'script', 'style', with_tail=False)
+            text = tree.text_content()
+        except etree.ParserError:
+            soup = BeautifulSoup(content, 'lxml')
             
             # Remove script and style elements
             for script in soup(["script", "style"]):
                 script.decompose()
             
-            # Get text content
             text = soup.get_text()
-            
-            # Clean up the text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
+        
+        # Clean up the text
+        return _WS_RE.sub(" ", text).strip()
+    
+    def _extract_html_text(self, content: bytes) -> ResumeExtractionResult:
+        """Extract text from HTML content"""
+        try:
+            text = self._html_to_text(content)
             
             if text.strip():
                 return ResumeExtractionResult(
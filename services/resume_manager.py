@@ -1,5 +1,10 @@
 import asyncio
-from typing import List, Dict, Any, Optional
+import bisect
+import os
+import re
+from dataclasses import dataclass, field
+from functools import partial
+from typing import List, Dict, Any, Optional, Tuple
 from concurrent.futures import ThreadPoolExecutor
 from services.google_drive_service import GoogleDriveService
 from services.pinecone_service import PineconeService
@@ -8,6 +13,43 @@ from utils.logger_config import setup_logging
 
 logger = setup_logging()
 
+# Google Drive URL formats, tried in order by _extract_file_id_from_url
+_DRIVE_FILE_ID_PATTERNS = (
+    re.compile(r'/file/d/([a-zA-Z0-9-_]+)'),  # https://drive.google.com/file/d/FILE_ID/view
+    re.compile(r'id=([a-zA-Z0-9-_]+)'),       # https://drive.google.com/open?id=FILE_ID
+    re.compile(r'/d/([a-zA-Z0-9-_]+)'),       # https://docs.google.com/document/d/FILE_ID
+)
+_SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.doc')
+
+# Match explanation bands: _MATCH_EXPLANATIONS[i] covers scores in
+# [_MATCH_THRESHOLDS[i-1], _MATCH_THRESHOLDS[i])
+_MATCH_THRESHOLDS = (0.6, 0.7, 0.8, 0.9)
+_MATCH_EXPLANATIONS = (
+    "Basic match - Limited alignment with requirements",
+    "Moderate match - Some relevant experience",
+    "Good match - Several key requirements match",
+    "Very good match - Most requirements align well",
+    "Excellent match - Strong alignment with job requirements",
+)
+
+@dataclass(slots=True)
+class Candidate:
+    """Matched resume candidate; converted to a dict only at the API boundary"""
+    id: str
+    name: str
+    email: str
+    phone: str
+    resume_url: str
+    file_name: str
+    skills: List[str] = field(default_factory=list)
+    experience_years: Any = 0
+    job_titles: List[str] = field(default_factory=list)
+    companies: List[str] = field(default_factory=list)
+    education: List[str] = field(default_factory=list)
+    summary: str = ''
+    match_score: float = 0.0
+    match_explanation: str = ''
+
 class ResumeManager:
     """Main service for managing resume ingestion and matching"""
     
@@ -15,7 +57,17 @@ class ResumeManager:
         self.drive_service = GoogleDriveService()
         self.pinecone_service = PineconeService()
         self.embedding_service = ResumeEmbeddingService()
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        
+        # Drive/Pinecone calls get a wide pool. Resume processing gets its own pool so it
+        # can't starve those calls; most of its time is spent waiting on OpenAI chat and
+        # embedding requests rather than CPU, so it is sized for I/O, not core count
+        self._io_executor = ThreadPoolExecutor(max_workers=32)
+        self._processing_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('RESUME_PROCESSING_WORKERS', '8'))
+        )
+        
+        # Number of concurrent Drive downloads during ingestion
+        self.max_concurrent_resumes = 20
         
         # Check if Google Drive is available
         if not self.drive_service.is_available:
@@ -23,6 +75,12 @@ class ResumeManager:
         else:
             logger.info("✅ ResumeManager initialized with full functionality")
     
+    def close(self):
+        """Shut down worker pools and the embedding service's pooled connections"""
+        self._io_executor.shutdown(wait=False)
+        self._processing_executor.shutdown(wait=False)
+        self.embedding_service.close()
+    
     async def ingest_all_resumes(self, folder_id: Optional[str] = None) -> Dict[str, Any]:
         """
         Ingest all resumes from Google Drive folder into Pinecone
@@ -38,7 +96,7 @@ class ResumeManager:
             
             # List all resume files (PDF and DOCX) in the folder
             resume_files = await asyncio.get_event_loop().run_in_executor(
-                self.executor, self.drive_service.list_resume_files, folder_id
+                self._io_executor, self.drive_service.list_resume_files, folder_id
             )
             
             if not resume_files:
@@ -53,50 +111,107 @@ class ResumeManager:
             
             logger.info(f"📁 Found {len(resume_files)} resume files to process")
             
-            # Process resumes in batches
-            batch_size = 5
-            processed_resumes = []
+            # Download workers hand resumes to a single processor through a bounded
+            # queue, so only a queue's worth of downloaded files waits in memory and
+            # workers pause while it is full. The processor embeds each batch with
+            # batched OpenAI calls while downloads continue, and streams finished
+            # resumes to Pinecone
+            process_batch_size = 32
+            upsert_batch_size = 100
+            queue = asyncio.Queue(maxsize=process_batch_size)
+            files_to_download = iter(resume_files)
+            loop = asyncio.get_event_loop()
+            processed_count = 0
+            pending_upserts = []
             failed_files = []
             
-            for i in range(0, len(resume_files), batch_size):
-                batch = resume_files[i:i + batch_size]
-                logger.info(f"🔄 Processing batch {i//batch_size + 1}/{(len(resume_files)-1)//batch_size + 1}")
-                
-                # Process batch concurrently
-                batch_results = await asyncio.gather(
-                    *[self._process_single_resume(file_info) for file_info in batch],
-                    return_exceptions=True
-                )
-                
-                # Collect results
-                for j, result in enumerate(batch_results):
-                    if isinstance(result, Exception):
-                        logger.error(f"❌ Failed to process {batch[j]['name']}: {str(result)}")
-                        failed_files.append({
-                            'name': batch[j]['name'],
-                            'error': str(result)
-                        })
-                    else:
-                        processed_resumes.append(result)
-                        logger.info(f"✅ Successfully processed: {result['metadata']['name']}")
-            
-            # Batch upsert to Pinecone
-            if processed_resumes:
-                logger.info(f"📦 Upserting {len(processed_resumes)} resumes to Pinecone")
-                await asyncio.get_event_loop().run_in_executor(
-                    self.executor, 
-                    self.pinecone_service.batch_upsert_resumes, 
-                    processed_resumes
+            def record_failure(file_info, error):
+                logger.error(f"❌ Failed to process {file_info['name']}: {str(error)}")
+                failed_files.append({
+                    'name': file_info['name'],
+                    'error': str(error)
+                })
+            
+            async def flush_upserts():
+                logger.info(f"📦 Upserting {len(pending_upserts)} resumes to Pinecone")
+                await loop.run_in_executor(
+                    self._io_executor,
+                    self.pinecone_service.batch_upsert_resumes,
+                    pending_upserts[:]
                 )
+                pending_upserts.clear()
+            
+            async def download_worker():
+                # Workers share one iterator, so each file is downloaded exactly once
+                for file_info in files_to_download:
+                    try:
+                        downloaded = await self._download_resume(file_info)
+                    except Exception as e:
+                        record_failure(file_info, e)
+                        continue
+                    await queue.put((file_info, downloaded))
+            
+            async def process_downloads():
+                nonlocal processed_count
+                while True:
+                    # Wait for one resume, then take whatever else is already queued
+                    batch = [await queue.get()]
+                    while len(batch) < process_batch_size and not queue.empty():
+                        batch.append(queue.get_nowait())
+                    
+                    # None is queued once every download worker has finished
+                    finished = batch[-1] is None
+                    if finished:
+                        batch.pop()
+                    
+                    if batch:
+                        results = await loop.run_in_executor(
+                            self._processing_executor,
+                            self.embedding_service.process_resumes_batch,
+                            [downloaded for _, downloaded in batch]
+                        )
+                        for (file_info, _), result in zip(batch, results):
+                            if isinstance(result, Exception):
+                                record_failure(file_info, result)
+                                continue
+                            
+                            processed_count += 1
+                            pending_upserts.append(result)
+                            logger.info(f"✅ Successfully processed: {result['metadata']['name']}")
+                        
+                        if len(pending_upserts) >= upsert_batch_size:
+                            await flush_upserts()
+                    
+                    if finished:
+                        return
+            
+            processor = asyncio.create_task(process_downloads())
+            downloads = asyncio.gather(*(
+                download_worker() for _ in range(min(self.max_concurrent_resumes, len(resume_files)))
+            ))
+            
+            # The processor only returns after the end marker, so finishing first means it failed
+            await asyncio.wait({processor, downloads}, return_when=asyncio.FIRST_COMPLETED)
+            if processor.done():
+                downloads.cancel()
+                await asyncio.gather(downloads, return_exceptions=True)
+                processor.result()
+            
+            await queue.put(None)
+            await processor
+            
+            # Upsert whatever is left
+            if pending_upserts:
+                await flush_upserts()
             
             # Return summary
             result = {
                 'success': True,
                 'total_files': len(resume_files),
-                'processed': len(processed_resumes),
+                'processed': processed_count,
                 'failed': len(failed_files),
                 'failed_files': failed_files,
-                'message': f'Successfully processed {len(processed_resumes)} out of {len(resume_files)} resumes'
+                'message': f'Successfully processed {processed_count} out of {len(resume_files)} resumes'
             }
             
             logger.info(f"🎉 Resume ingestion completed: {result['message']}")
@@ -125,20 +240,21 @@ class ResumeManager:
             if not file_id:
                 raise ValueError("Invalid Google Drive URL format")
             
-            # Get file metadata from Google Drive
+            # Get file metadata from Google Drive; this is the only metadata request
+            # for the file, the download and shareable link both reuse it
             def get_file_metadata(file_id):
-                return self.drive_service.service.files().get(fileId=file_id).execute()
+                return self.drive_service.service.files().get(
+                    fileId=file_id, fields="id, name, mimeType, webViewLink"
+                ).execute()
             
             file_info = await asyncio.get_event_loop().run_in_executor(
-                self.executor, 
-                get_file_metadata,
-                file_id
+                self._io_executor, get_file_metadata, file_id
             )
             
             # Use provided file name or get from metadata
             actual_file_name = file_name or file_info.get('name', 'unknown_resume')
             
-            # Validate file type
+            # Validate file type before downloading anything
             if not self._is_supported_file_type(actual_file_name):
                 raise ValueError(f"Unsupported file type. Only PDF and DOCX files are supported.")
             
@@ -148,17 +264,17 @@ class ResumeManager:
             file_info_dict = {
                 'id': file_id,
                 'name': actual_file_name,
-                'webViewLink': google_drive_url,
+                'webViewLink': file_info.get('webViewLink') or google_drive_url,
                 'webContentLink': f"https://drive.google.com/uc?id={file_id}&export=download"
             }
             
-            # Process the single resume
+            # Download and process the single resume
             processed_resume = await self._process_single_resume(file_info_dict)
             
             # Upload to Pinecone
             logger.info("📦 Uploading to Pinecone...")
             await asyncio.get_event_loop().run_in_executor(
-                self.executor,
+                self._io_executor,
                 self.pinecone_service.upsert_resume,
                 processed_resume['id'],
                 processed_resume['embedding'],
@@ -188,17 +304,8 @@ class ResumeManager:
     
     def _extract_file_id_from_url(self, url: str) -> Optional[str]:
         """Extract Google Drive file ID from various URL formats"""
-        import re
-        
-        # Pattern for different Google Drive URL formats
-        patterns = [
-            r'/file/d/([a-zA-Z0-9-_]+)',  # https://drive.google.com/file/d/FILE_ID/view
-            r'id=([a-zA-Z0-9-_]+)',       # https://drive.google.com/open?id=FILE_ID
-            r'/d/([a-zA-Z0-9-_]+)',       # https://docs.google.com/document/d/FILE_ID
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in _DRIVE_FILE_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         
@@ -206,8 +313,7 @@ class ResumeManager:
     
     def _is_supported_file_type(self, file_name: str) -> bool:
         """Check if file type is supported (PDF or DOCX)"""
-        supported_extensions = ['.pdf', '.docx', '.doc']
-        return any(file_name.lower().endswith(ext) for ext in supported_extensions)
+        return file_name.lower().endswith(_SUPPORTED_EXTENSIONS)
     
     async def upload_resume_from_file(self, file_content: bytes, file_name: str, google_drive_url: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -232,7 +338,7 @@ class ResumeManager:
             
             # Process the resume using the embedding service
             processed_resume = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
+                self._processing_executor,
                 self.embedding_service.process_resume,
                 file_name,
                 file_content,
@@ -242,7 +348,7 @@ class ResumeManager:
             # Upload to Pinecone
             logger.info("📦 Uploading to Pinecone...")
             await asyncio.get_event_loop().run_in_executor(
-                self.executor,
+                self._io_executor,
                 self.pinecone_service.upsert_resume,
                 processed_resume['id'],
                 processed_resume['embedding'],
@@ -274,6 +380,34 @@ class ResumeManager:
                 'error': str(e)
             }
     
+    async def _download_resume(self, file_info: Dict) -> Tuple[str, bytes, str]:
+        """
+        Fetch a resume's content and shareable link from Google Drive
+        
+        Args:
+            file_info: Google Drive file information
+            
+        Returns:
+            Tuple of (file name, file content, shareable Drive URL)
+        """
+        file_id = file_info['id']
+        loop = asyncio.get_event_loop()
+        
+        # Start the download first so it overlaps with any link lookup
+        download_future = loop.run_in_executor(self._io_executor, partial(
+            self.drive_service.download_file_content, file_id, file_name=file_info.get('name')
+        ))
+        
+        # Folder listings and upload metadata already carry the shareable link
+        drive_url = file_info.get('webViewLink')
+        if not drive_url:
+            drive_url = await loop.run_in_executor(
+                self._io_executor, self.drive_service.get_shareable_link, file_id
+            )
+        file_content = await download_future
+        
+        return file_info['name'], file_content, drive_url
+    
     async def _process_single_resume(self, file_info: Dict) -> Dict[str, Any]:
         """
         Process a single resume file
@@ -285,22 +419,11 @@ class ResumeManager:
             Processed resume data
         """
         try:
-            file_id = file_info['id']
-            file_name = file_info['name']
-            
-            # Download file content
-            file_content = await asyncio.get_event_loop().run_in_executor(
-                self.executor, self.drive_service.download_file_content, file_id
-            )
-            
-            # Get shareable link
-            drive_url = await asyncio.get_event_loop().run_in_executor(
-                self.executor, self.drive_service.get_shareable_link, file_id
-            )
+            file_name, file_content, drive_url = await self._download_resume(file_info)
             
             # Process resume
             processed_resume = await asyncio.get_event_loop().run_in_executor(
-                self.executor, 
+                self._processing_executor,
                 self.embedding_service.process_resume,
                 file_name, file_content, drive_url
             )
@@ -327,38 +450,40 @@ class ResumeManager:
             
             # Generate embedding for job description
             job_embedding = await asyncio.get_event_loop().run_in_executor(
-                self.executor, 
+                self._io_executor, 
                 self.embedding_service.generate_embedding,
                 job_description
             )
             
             # Search similar resumes in Pinecone
             matches = await asyncio.get_event_loop().run_in_executor(
-                self.executor,
+                self._io_executor,
                 self.pinecone_service.search_similar_resumes,
                 job_embedding, top_k
             )
             
             # Format results for API response
             candidates = []
+            explain = self._generate_match_explanation
             for match in matches:
-                candidate = {
-                    'id': match['id'],
-                    'name': match['metadata'].get('name', 'Unknown'),
-                    'email': match['metadata'].get('email', ''),
-                    'phone': match['metadata'].get('phone', ''),
-                    'resume_url': match['metadata'].get('drive_url', ''),
-                    'file_name': match['metadata'].get('file_name', ''),
-                    'skills': match['metadata'].get('skills', []),
-                    'experience_years': match['metadata'].get('experience_years', 0),
-                    'job_titles': match['metadata'].get('job_titles', []),
-                    'companies': match['metadata'].get('companies', []),
-                    'education': match['metadata'].get('education', []),
-                    'summary': match['metadata'].get('summary', ''),
-                    'match_score': round(match['score'] * 100, 2),  # Convert to percentage
-                    'match_explanation': self._generate_match_explanation(match['score'])
-                }
-                candidates.append(candidate)
+                md = match['metadata']
+                score = match['score']
+                candidates.append(Candidate(
+                    id=match['id'],
+                    name=md.get('name', 'Unknown'),
+                    email=md.get('email', ''),
+                    phone=md.get('phone', ''),
+                    resume_url=md.get('drive_url', ''),
+                    file_name=md.get('file_name', ''),
+                    skills=md.get('skills', []),
+                    experience_years=md.get('experience_years', 0),
+                    job_titles=md.get('job_titles', []),
+                    companies=md.get('companies', []),
+                    education=md.get('education', []),
+                    summary=md.get('summary', ''),
+                    match_score=round(score * 100, 2),  # Convert to percentage
+                    match_explanation=explain(score)
+                ))
             
             result = {
                 'candidates': candidates,
@@ -376,16 +501,7 @@ class ResumeManager:
     
     def _generate_match_explanation(self, score: float) -> str:
         """Generate human-readable match explanation based on score"""
-        if score >= 0.9:
-            return "Excellent match - Strong alignment with job requirements"
-        elif score >= 0.8:
-            return "Very good match - Most requirements align well"
-        elif score >= 0.7:
-            return "Good match - Several key requirements match"
-        elif score >= 0.6:
-            return "Moderate match - Some relevant experience"
-        else:
-            return "Basic match - Limited alignment with requirements"
+        return _MATCH_EXPLANATIONS[bisect.bisect_right(_MATCH_THRESHOLDS, score)]
     
     async def get_resume_stats(self) -> Dict[str, Any]:
         """
@@ -396,7 +512,7 @@ class ResumeManager:
         """
         try:
             stats = await asyncio.get_event_loop().run_in_executor(
-                self.executor, self.pinecone_service.get_index_stats
+                self._io_executor, self.pinecone_service.get_index_stats
             )
             
             return {
@@ -425,7 +541,7 @@ class ResumeManager:
             logger.warning("🧹 Deleting all resumes from database")
             
             await asyncio.get_event_loop().run_in_executor(
-                self.executor, self.pinecone_service.clear_index
+                self._io_executor, self.pinecone_service.clear_index
             )
             
             return {
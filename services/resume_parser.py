@@ -1,148 +1,242 @@
-import PyPDF2
+import asyncio
+import hashlib
+import fitz
 import pdfplumber
 import re
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
+from concurrent.futures import Executor
+from functools import lru_cache
 from fastapi import UploadFile
 import io
+from collections import Counter
 from loguru import logger
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.corpus import stopwords
-import string
+import ahocorasick
 
 from models.schemas import ResumeData
+from services.resume_cache import ResumeCache
+
+# Part of the resume_data_cache key; bump whenever extraction or parsing output
+# changes so cached parses from older code are not served
+_PARSER_VERSION = 1
+
+# Alphabetic words of 3+ letters; replaces NLTK tokenization plus the isalpha/len filters
+_WORD_RE = re.compile(r"[a-z]{3,}")
+
+# NLTK's English stopword list, limited to the words _WORD_RE can produce
+_STOPWORDS = frozenset((
+    'about', 'above', 'after', 'again', 'against', 'ain', 'all', 'and', 'any', 'are',
+    'aren', 'because', 'been', 'before', 'being', 'below', 'between', 'both', 'but',
+    'can', 'couldn', 'did', 'didn', 'does', 'doesn', 'doing', 'don', 'down', 'during',
+    'each', 'few', 'for', 'from', 'further', 'had', 'hadn', 'has', 'hasn', 'have', 'haven',
+    'having', 'her', 'here', 'hers', 'herself', 'him', 'himself', 'his', 'how', 'into',
+    'isn', 'its', 'itself', 'just', 'mightn', 'more', 'most', 'mustn', 'myself', 'needn',
+    'nor', 'not', 'now', 'off', 'once', 'only', 'other', 'our', 'ours', 'ourselves',
+    'out', 'over', 'own', 'same', 'shan', 'she', 'should', 'shouldn', 'some', 'such',
+    'than', 'that', 'the', 'their', 'theirs', 'them', 'themselves', 'then', 'there',
+    'these', 'they', 'this', 'those', 'through', 'too', 'under', 'until', 'very', 'was',
+    'wasn', 'were', 'weren', 'what', 'when', 'where', 'which', 'while', 'who', 'whom',
+    'why', 'will', 'with', 'won', 'wouldn', 'you', 'your', 'yours', 'yourself', 'yourselves'
+))
+
+# Keyword sets located with a single alternation scan, see _scan_keywords
+_EDUCATION_KEYWORDS = (
+    'bachelor', 'master', 'phd', 'doctorate', 'mba', 'bs', 'ba', 'ms', 'ma',
+    'university', 'college', 'institute', 'school'
+)
+_CERTIFICATION_KEYWORDS = (
+    'certified', 'certification', 'certificate', 'aws', 'azure', 'gcp',
+    'pmp', 'cissp', 'cisa', 'cism', 'comptia', 'cisco', 'microsoft'
+)
+_JOB_TITLE_KEYWORDS = (
+    'senior', 'junior', 'lead', 'principal', 'staff', 'director', 'manager', 'engineer',
+    'developer', 'analyst', 'specialist', 'consultant', 'architect', 'designer',
+    'coordinator', 'supervisor', 'executive', 'officer', 'associate', 'assistant'
+)
 
 class ResumeParser:
     """Parse PDF resumes and extract relevant information"""
     
     def __init__(self):
-        self._download_nltk_data()
+        self.resume_cache = ResumeCache()
         self.skills_keywords = self._load_skills_database()
+        # Lowercase keyword -> canonical skill name, flattened across categories
+        self.skill_canon = {
+            skill.lower(): skill
+            for skills_list in self.skills_keywords.values()
+            for skill in skills_list
+        }
+        self.skills_automaton = self._build_skills_automaton()
+        self.keyword_buckets = {
+            **dict.fromkeys(_EDUCATION_KEYWORDS, 'education'),
+            **dict.fromkeys(_CERTIFICATION_KEYWORDS, 'certifications'),
+            **dict.fromkeys(_JOB_TITLE_KEYWORDS, 'job_titles')
+        }
         self.experience_patterns = self._compile_experience_patterns()
     
-    def _download_nltk_data(self):
-        """Download required NLTK data"""
-        try:
-            nltk.data.find('tokenizers/punkt')
-            nltk.data.find('corpora/stopwords')
-        except LookupError:
-            nltk.download('punkt')
-            nltk.download('stopwords')
-    
-    def _load_skills_database(self) -> Dict[str, List[str]]:
-        """Load comprehensive skills database"""
+    def _load_skills_database(self) -> Dict[str, Tuple[str, ...]]:
+        """Load comprehensive skills database (immutable, shared by all parses)"""
         return {
-            'programming': [
+            'programming': (
                 'python', 'javascript', 'java', 'c++', 'c#', 'php', 'ruby', 'go', 'rust',
                 'typescript', 'scala', 'kotlin', 'swift', 'r', 'matlab', 'sql', 'html',
                 'css', 'react', 'angular', 'vue', 'node.js', 'express', 'django', 'flask',
                 'spring', 'laravel', 'rails', '.net', 'asp.net'
-            ],
-            'databases': [
+            ),
+            'databases': (
                 'mysql', 'postgresql', 'mongodb', 'redis', 'elasticsearch', 'cassandra',
                 'oracle', 'sql server', 'sqlite', 'dynamodb', 'firebase'
-            ],
-            'cloud': [
+            ),
+            'cloud': (
                 'aws', 'azure', 'gcp', 'google cloud', 'docker', 'kubernetes', 'terraform',
                 'ansible', 'jenkins', 'gitlab ci', 'github actions', 'circleci'
-            ],
-            'data_science': [
+            ),
+            'data_science': (
                 'machine learning', 'deep learning', 'data analysis', 'pandas', 'numpy',
                 'scikit-learn', 'tensorflow', 'pytorch', 'keras', 'tableau', 'power bi',
                 'jupyter', 'spark', 'hadoop', 'nlp', 'computer vision'
-            ],
-            'tools': [
+            ),
+            'tools': (
                 'git', 'jira', 'confluence', 'slack', 'figma', 'sketch', 'photoshop',
                 'illustrator', 'postman', 'swagger', 'linux', 'bash', 'powershell'
-            ]
+            )
         }
     
+    def _build_skills_automaton(self) -> ahocorasick.Automaton:
+        """Build an Aho-Corasick automaton matching every skill keyword in one pass"""
+        automaton = ahocorasick.Automaton()
+        for keyword, skill in self.skill_canon.items():
+            automaton.add_word(keyword, skill)
+        automaton.make_automaton()
+        return automaton
+    
     def _compile_experience_patterns(self) -> Dict[str, re.Pattern]:
         """Compile regex patterns for experience extraction"""
+        # All keywords are ASCII, so ASCII mode skips Unicode case folding and class lookups
+        # Longest keywords first so e.g. 'certification' wins over 'certified' prefixes
+        keywords = sorted(self.keyword_buckets, key=len, reverse=True)
         return {
-            'years': re.compile(r'(\d+)[\s\-\+]*(?:years?|yrs?)', re.IGNORECASE),
-            'months': re.compile(r'(\d+)[\s\-\+]*(?:months?|mos?)', re.IGNORECASE),
-            'email': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
-            'phone': re.compile(r'(?:\+?1[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})'),
-            'job_titles': re.compile(r'\b(?:senior|junior|lead|principal|staff|director|manager|engineer|developer|analyst|specialist|consultant|architect|designer|coordinator|supervisor|executive|officer|associate|assistant)\b', re.IGNORECASE)
+            'keywords': re.compile(r'\b(?:' + '|'.join(map(re.escape, keywords)) + r')\b', re.IGNORECASE | re.ASCII),
+            # Line patterns, applied to pre-lowercased lines
+            'education_line': self._compile_keyword_pattern(_EDUCATION_KEYWORDS),
+            'certification_line': self._compile_keyword_pattern(_CERTIFICATION_KEYWORDS),
+            'company_line': re.compile(r'inc|corp|ltd|llc|company', re.ASCII),
+            # Explicit seniority mentions, applied to the lowercased text
+            'level_senior': self._compile_keyword_pattern(('senior', 'lead', 'principal', 'staff')),
+            'level_executive': self._compile_keyword_pattern(('director', 'vp', 'cto', 'ceo', 'executive')),
+            'level_entry': self._compile_keyword_pattern(('junior', 'intern', 'entry', 'graduate')),
+            'years': re.compile(r'(\d+)[\s\-\+]*(?:years?|yrs?)', re.IGNORECASE | re.ASCII),
+            'months': re.compile(r'(\d+)[\s\-\+]*(?:months?|mos?)', re.IGNORECASE | re.ASCII),
+            'email': re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b', re.ASCII),
+            # 2-4 words of letters and dots (e.g. "J. R. Smith"); Unicode-aware for non-ASCII names
+            'name': re.compile(r'\.*[^\W\d_]+(?:\.+[^\W\d_]+)*\.*(?:\s+\.*[^\W\d_]+(?:\.+[^\W\d_]+)*\.*){1,3}'),
+            'phone': re.compile(r'(?:\+?1[-.\s]?)?\(?([0-9]{3})\)?[-.\s]?([0-9]{3})[-.\s]?([0-9]{4})', re.ASCII)
         }
     
-    async def parse_pdf(self, file: UploadFile) -> ResumeData:
-        """Parse PDF resume and extract structured data"""
+    @staticmethod
+    def _compile_keyword_pattern(keywords) -> re.Pattern:
+        """Compile a word-bounded alternation of lowercase keywords, longest first"""
+        ordered = sorted(keywords, key=len, reverse=True)
+        return re.compile(r'\b(?:' + '|'.join(map(re.escape, ordered)) + r')\b', re.ASCII)
+    
+    async def parse_pdf(self, file: UploadFile, executor: Optional[Executor] = None) -> ResumeData:
+        """
+        Parse PDF resume and extract structured data
+        
+        Args:
+            file: Uploaded PDF file
+            executor: Optional process pool to parse in, bypassing the GIL;
+                parsing runs in a worker thread when not provided
+        """
         try:
-            # Read file content
+            # Read file content, then release the upload's spooled copy so only one
+            # buffer of the PDF stays alive during the parse
             content = await file.read()
+            file.file.close()
             
-            # Extract text using both PyPDF2 and pdfplumber for better coverage
-            text = self._extract_text_pypdf2(content)
-            if not text.strip():
-                text = self._extract_text_pdfplumber(content)
-            
-            if not text.strip():
-                raise ValueError("Could not extract text from PDF")
-            
-            logger.info(f"Extracted {len(text)} characters from resume")
-            
-            # Parse structured data
-            resume_data = self._parse_text_content(text)
-            
-            return resume_data
+            # Extraction and parsing are CPU-bound, keep them off the event loop
+            if executor is not None:
+                return await asyncio.get_running_loop().run_in_executor(executor, _parse_pdf_bytes, content)
+            return await asyncio.to_thread(self._parse_pdf_content, content)
             
         except Exception as e:
             logger.error(f"Error parsing PDF: {str(e)}")
             raise ValueError(f"Failed to parse resume: {str(e)}")
     
-    def _extract_text_pypdf2(self, content: bytes) -> str:
-        """Extract text using PyPDF2"""
+    def _parse_pdf_content(self, content: bytes) -> ResumeData:
+        """Extract text from PDF bytes and parse it into structured data"""
+        # Re-uploads of the same PDF skip extraction and parsing entirely
+        content_hash = f"v{_PARSER_VERSION}:{hashlib.sha256(content).hexdigest()}"
+        cached = self.resume_cache.get_resume_data(content_hash)
+        if cached:
+            logger.info("Using cached parse for previously seen resume")
+            return ResumeData(**cached)
+        
+        # PyMuPDF is the fast path; pdfplumber only runs if it finds no text
+        text = self._extract_text_pymupdf(content)
+        if not text.strip():
+            text = self._extract_text_pdfplumber(content)
+        
+        if not text.strip():
+            raise ValueError("Could not extract text from PDF")
+        
+        logger.info(f"Extracted {len(text)} characters from resume")
+        
+        # Parse structured data
+        resume_data = self._parse_text_content(text)
+        self.resume_cache.put_resume_data(content_hash, resume_data.model_dump())
+        return resume_data
+    
+    def _extract_text_pymupdf(self, content: bytes) -> str:
+        """Extract text using PyMuPDF (native MuPDF, no layout analysis)"""
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(content))
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+            with fitz.open(stream=content, filetype="pdf") as doc:
+                return "\n".join(page.get_text("text") for page in doc)
         except Exception as e:
-            logger.warning(f"PyPDF2 extraction failed: {str(e)}")
+            logger.warning(f"PyMuPDF extraction failed: {str(e)}")
             return ""
     
     def _extract_text_pdfplumber(self, content: bytes) -> str:
         """Extract text using pdfplumber (better for complex layouts)"""
         try:
             with pdfplumber.open(io.BytesIO(content)) as pdf:
-                text = ""
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-            return text
+                page_texts = [page.extract_text() for page in pdf.pages]
+            return "\n".join([page_text for page_text in page_texts if page_text])
         except Exception as e:
             logger.warning(f"pdfplumber extraction failed: {str(e)}")
             return ""
     
     def _parse_text_content(self, text: str) -> ResumeData:
         """Parse extracted text and create structured data"""
-        # Clean and normalize text
+        # Clean and normalize text; line-based extractors use the original lines
+        # since cleaning collapses newlines
         clean_text = self._clean_text(text)
+        text_lower = clean_text.lower()
+        lines = [line.strip() for line in text.split('\n') if line.strip()]
+        lines_lower = [line.lower() for line in lines]
+        
+        # Locate education, certification and job title keywords in one pass
+        keyword_hits = self._scan_keywords(clean_text)
         
         # Extract basic information
-        name = self._extract_name(clean_text)
+        name = self._extract_name(lines)
         email = self._extract_email(clean_text)
         phone = self._extract_phone(clean_text)
         
         # Extract skills and keywords
-        skills = self._extract_skills(clean_text)
-        keywords = self._extract_keywords(clean_text)
+        skills = self._extract_skills(text_lower)
+        keywords = self._extract_keywords(text_lower)
         
         # Extract experience information
         years_experience = self._extract_years_experience(clean_text)
-        experience_level = self._determine_experience_level(years_experience, clean_text)
+        experience_level = self._determine_experience_level(years_experience, text_lower)
         
         # Extract job titles and companies
-        job_titles = self._extract_job_titles(clean_text)
-        companies = self._extract_companies(clean_text)
+        job_titles = self._extract_job_titles(keyword_hits)
+        companies = self._extract_companies(lines, lines_lower)
         
         # Extract education and certifications
-        education = self._extract_education(clean_text)
-        certifications = self._extract_certifications(clean_text)
+        education = self._extract_education(lines, lines_lower, keyword_hits)
+        certifications = self._extract_certifications(lines, lines_lower, keyword_hits)
         
         return ResumeData(
             name=name,
@@ -160,19 +254,25 @@ class ResumeParser:
     
     def _clean_text(self, text: str) -> str:
         """Clean and normalize text"""
-        # Remove extra whitespace and normalize
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        return text
+        # Collapse all whitespace runs to single spaces and trim the ends
+        return ' '.join(text.split())
     
-    def _extract_name(self, text: str) -> Optional[str]:
+    def _scan_keywords(self, text: str) -> Dict[str, set]:
+        """Scan the text once for all education, certification and job title keywords"""
+        hits = {'education': set(), 'certifications': set(), 'job_titles': set()}
+        for match in self.experience_patterns['keywords'].finditer(text):
+            word = match.group(0)
+            bucket = self.keyword_buckets[word.lower()]
+            # Job titles are reported as written; other buckets hold the lowercase keyword
+            hits[bucket].add(word if bucket == 'job_titles' else word.lower())
+        return hits
+    
+    def _extract_name(self, lines: List[str]) -> Optional[str]:
         """Extract candidate name (simple heuristic)"""
-        lines = text.split('\n')[:5]  # Check first 5 lines
-        for line in lines:
-            line = line.strip()
+        name_pattern = self.experience_patterns['name']
+        for line in lines[:5]:  # Check first 5 lines
             # Look for lines with 2-4 words, likely to be names
-            words = line.split()
-            if 2 <= len(words) <= 4 and all(word.replace('.', '').isalpha() for word in words):
+            if name_pattern.fullmatch(line):
                 return line
         return None
     
@@ -186,44 +286,18 @@ class ResumeParser:
         match = self.experience_patterns['phone'].search(text)
         return match.group(0) if match else None
     
-    def _extract_skills(self, text: str) -> List[str]:
-        """Extract technical skills from text"""
-        text_lower = text.lower()
-        found_skills = []
-        
-        # Check all skill categories
-        for category, skills_list in self.skills_keywords.items():
-            for skill in skills_list:
-                if skill.lower() in text_lower:
-                    found_skills.append(skill)
-        
-        # Remove duplicates and return
-        return list(set(found_skills))
+    def _extract_skills(self, text_lower: str) -> List[str]:
+        """Extract technical skills from lowercased text"""
+        # Single leftmost-longest scan for all skill keywords, so 'javascript'
+        # is not also reported as 'java' and 'sql server' not also as 'sql'
+        # dict.fromkeys dedupes in one hashing pass and keeps first-mention order
+        return list(dict.fromkeys(skill for _, skill in self.skills_automaton.iter_long(text_lower)))
     
-    def _extract_keywords(self, text: str) -> List[str]:
-        """Extract important keywords using NLP"""
-        try:
-            # Tokenize and remove stopwords
-            tokens = word_tokenize(text.lower())
-            stop_words = set(stopwords.words('english'))
-            
-            # Filter tokens
-            keywords = [
-                token for token in tokens 
-                if token not in stop_words 
-                and token not in string.punctuation 
-                and len(token) > 2
-                and token.isalpha()
-            ]
-            
-            # Get most frequent keywords
-            from collections import Counter
-            keyword_counts = Counter(keywords)
-            return [word for word, count in keyword_counts.most_common(20)]
-            
-        except Exception as e:
-            logger.warning(f"Keyword extraction failed: {str(e)}")
-            return []
+    def _extract_keywords(self, text_lower: str) -> List[str]:
+        """Extract the most frequent non-stopword terms from lowercased text"""
+        # Filter into a plain list so Counter takes its C counting fast path
+        words = [word for word in _WORD_RE.findall(text_lower) if word not in _STOPWORDS]
+        return [word for word, count in Counter(words).most_common(20)]
     
     def _extract_years_experience(self, text: str) -> Optional[int]:
         """Extract years of experience"""
@@ -248,16 +322,14 @@ class ResumeParser:
         
         return int(total_years) if total_years > 0 else None
     
-    def _determine_experience_level(self, years: Optional[int], text: str) -> str:
+    def _determine_experience_level(self, years: Optional[int], text_lower: str) -> str:
         """Determine experience level based on years and text analysis"""
-        text_lower = text.lower()
-        
         # Check for explicit level mentions
-        if any(word in text_lower for word in ['senior', 'lead', 'principal', 'staff']):
+        if self.experience_patterns['level_senior'].search(text_lower):
             return 'senior'
-        elif any(word in text_lower for word in ['director', 'vp', 'cto', 'ceo', 'executive']):
+        elif self.experience_patterns['level_executive'].search(text_lower):
             return 'executive'
-        elif any(word in text_lower for word in ['junior', 'intern', 'entry', 'graduate']):
+        elif self.experience_patterns['level_entry'].search(text_lower):
             return 'entry'
         
         # Determine by years of experience
@@ -272,62 +344,59 @@ class ResumeParser:
         else:
             return 'executive'
     
-    def _extract_job_titles(self, text: str) -> List[str]:
-        """Extract job titles from text"""
-        matches = self.experience_patterns['job_titles'].findall(text)
-        return list(set(matches))
+    def _extract_job_titles(self, keyword_hits: Dict[str, set]) -> List[str]:
+        """Extract job titles from the keyword scan"""
+        return list(keyword_hits['job_titles'])
+    
+    def _matching_lines(self, lines: List[str], lines_lower: List[str], pattern: re.Pattern) -> List[str]:
+        """Return the lines whose lowercased form matches the pattern, in document order"""
+        return [line for line, line_lower in zip(lines, lines_lower) if pattern.search(line_lower)]
     
-    def _extract_companies(self, text: str) -> List[str]:
+    def _extract_companies(self, lines: List[str], lines_lower: List[str]) -> List[str]:
         """Extract company names (basic implementation)"""
         # This is a simplified implementation
         # In production, you might use NER or a company database
-        lines = text.split('\n')
-        companies = []
-        
-        for line in lines:
-            # Look for lines that might contain company names
-            if any(word in line.lower() for word in ['inc', 'corp', 'ltd', 'llc', 'company']):
-                companies.append(line.strip())
-        
+        companies = self._matching_lines(lines, lines_lower, self.experience_patterns['company_line'])
         return companies[:5]  # Return top 5
     
-    def _extract_education(self, text: str) -> List[str]:
+    def _first_line_per_keyword(self, lines: List[str], lines_lower: List[str], pattern: re.Pattern,
+                                found_keywords: set) -> List[str]:
+        """Return the first line mentioning each found keyword, deduplicated, in document order"""
+        first_line = {}
+        for index, line_lower in enumerate(lines_lower):
+            for match in pattern.finditer(line_lower):
+                first_line.setdefault(match.group(0), index)
+            # Stop once every keyword from the keyword scan has been located
+            if len(first_line) >= len(found_keywords):
+                break
+        return [lines[index] for index in sorted(set(first_line.values()))]
+    
+    def _extract_education(self, lines: List[str], lines_lower: List[str], keyword_hits: Dict[str, set]) -> List[str]:
         """Extract education information"""
-        education_keywords = [
-            'bachelor', 'master', 'phd', 'doctorate', 'mba', 'bs', 'ba', 'ms', 'ma',
-            'university', 'college', 'institute', 'school'
-        ]
-        
-        text_lower = text.lower()
-        education = []
-        
-        for keyword in education_keywords:
-            if keyword in text_lower:
-                # Find the line containing the education keyword
-                lines = text.split('\n')
-                for line in lines:
-                    if keyword in line.lower():
-                        education.append(line.strip())
-                        break
+        # Skip the line pass entirely when the keyword scan found nothing
+        if not keyword_hits['education']:
+            return []
         
-        return list(set(education))[:3]  # Return top 3
+        education = self._first_line_per_keyword(
+            lines, lines_lower, self.experience_patterns['education_line'], keyword_hits['education']
+        )
+        return education[:3]  # Return top 3
     
-    def _extract_certifications(self, text: str) -> List[str]:
+    def _extract_certifications(self, lines: List[str], lines_lower: List[str], keyword_hits: Dict[str, set]) -> List[str]:
         """Extract certifications"""
-        cert_keywords = [
-            'certified', 'certification', 'certificate', 'aws', 'azure', 'gcp',
-            'pmp', 'cissp', 'cisa', 'cism', 'comptia', 'cisco', 'microsoft'
-        ]
-        
-        text_lower = text.lower()
-        certifications = []
-        
-        for keyword in cert_keywords:
-            if keyword in text_lower:
-                lines = text.split('\n')
-                for line in lines:
-                    if keyword in line.lower():
-                        certifications.append(line.strip())
-                        break
+        if not keyword_hits['certifications']:
+            return []
         
-        return list(set(certifications))[:5]  # Return top 5
+        certifications = self._first_line_per_keyword(
+            lines, lines_lower, self.experience_patterns['certification_line'], keyword_hits['certifications']
+        )
+        return certifications[:5]  # Return top 5
+
+@lru_cache(maxsize=1)
+def get_resume_parser() -> ResumeParser:
+    """Return the shared ResumeParser, building its skills automaton and patterns only once"""
+    return ResumeParser()
+
+def _parse_pdf_bytes(content: bytes) -> ResumeData:
+    """Process pool entry point; each worker process reuses its own shared parser"""
+    return get_resume_parser()._parse_pdf_content(content)
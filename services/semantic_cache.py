@@ -0,0 +1,95 @@
+import copy
+import time
+import threading
+from typing import List, Any, Optional, Hashable
+import numpy as np
+from utils.logger_config import setup_logging
+
+logger = setup_logging()
+
+class SemanticQueryCache:
+    """In-memory ring buffer that reuses results for near-duplicate query embeddings"""
+    
+    def __init__(self, dimension: int, capacity: int = 512, threshold: float = 0.95, ttl: float = 3600):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        
+        # Vectors are normalized on insert so cosine similarity is a plain dot product
+        self._vectors = np.zeros((capacity, dimension), dtype=np.float32)
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._keys: List[Optional[Hashable]] = [None] * capacity
+        self._results: List[Any] = [None] * capacity
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+    
+    def get(self, embedding, key: Hashable = None) -> Optional[Any]:
+        """
+        Return cached results for a semantically similar query
+        
+        Args:
+            embedding: Query embedding
+            key: Extra query parameters (top_k, filters) that must match exactly
+        
+        Returns:
+            Cached results, or None on a miss
+        """
+        query = self._normalize(embedding)
+        if query is None:
+            return None
+        
+        with self._lock:
+            if not self._size:
+                return None
+            
+            similarities = self._vectors[:self._size] @ query
+            
+            # Exclude expired entries and entries cached for different parameters
+            now = time.time()
+            for i in range(self._size):
+                if now - self._timestamps[i] >= self.ttl or self._keys[i] != key:
+                    similarities[i] = -np.inf
+            
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.threshold:
+                return None
+            
+            logger.info(f"⚡ Semantic cache hit (similarity {similarities[best]:.3f})")
+            return copy.deepcopy(self._results[best])
+    
+    def put(self, embedding, results: Any, key: Hashable = None):
+        """
+        Cache results for a query embedding, evicting the oldest entry when full
+        
+        Args:
+            embedding: Query embedding
+            results: Results to return for similar queries
+            key: Extra query parameters (top_k, filters) that must match exactly
+        """
+        vector = self._normalize(embedding)
+        if vector is None:
+            return
+        
+        with self._lock:
+            slot = self._next
+            self._vectors[slot] = vector
+            self._timestamps[slot] = time.time()
+            self._keys[slot] = key
+            self._results[slot] = copy.deepcopy(results)
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+    
+    def clear(self):
+        """Drop all cached entries (e.g. after the underlying index changes)"""
+        with self._lock:
+            self._keys = [None] * self.capacity
+            self._results = [None] * self.capacity
+            self._size = 0
+            self._next = 0
@@ -1,65 +1,94 @@
 import pytest
-import asyncio
-from fastapi.testclient import TestClient
-from unittest.mock import Mock, patch
+import pytest_asyncio
+import httpx
+from unittest.mock import Mock, MagicMock, AsyncMock, patch, create_autospec
 import io
 from pathlib import Path
 
-from main import app
 from models.schemas import ResumeData, JobResult
 
-client = TestClient(app)
+@pytest.fixture(scope="session", autouse=True)
+def resume_cache_path(tmp_path_factory):
+    """Point the SQLite resume caches at a temporary database instead of ./cache"""
+    db_path = tmp_path_factory.mktemp("cache") / "resume_cache.db"
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("RESUME_CACHE_PATH", str(db_path))
+        yield db_path
+
+@pytest.fixture(scope="module")
+def app():
+    """FastAPI app, imported on first use so collection skips loading every service"""
+    from main import app
+    return app
+
+@pytest_asyncio.fixture
+async def aclient(app):
+    """Async client that calls the ASGI app directly in the test event loop"""
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+@pytest.fixture(scope="session")
+def _pdf_bytes():
+    """Raw content of the sample PDF, shared by every test"""
+    # Create a simple text file that mimics a PDF
+    return b"Sample PDF content for testing"
 
 @pytest.fixture
-def sample_pdf_file():
+def sample_pdf_file(_pdf_bytes):
     """Create a sample PDF file for testing"""
-    # Create a simple text file that mimics a PDF
-    content = b"Sample PDF content for testing"
-    return ("test_resume.pdf", io.BytesIO(content), "application/pdf")
+    # Fresh file object per test since uploading consumes it
+    return ("test_resume.pdf", io.BytesIO(_pdf_bytes), "application/pdf")
+
+# Sample data is validated once at import; fixtures hand out copies because
+# tests such as test_rank_jobs mutate the job results they are given
+SAMPLE_RESUME_DATA = ResumeData(
+    name="John Doe",
+    email="john.doe@example.com",
+    skills=["Python", "React", "AWS", "Docker"],
+    experience_level="senior",
+    job_titles=["Software Engineer", "Senior Developer"],
+    years_of_experience=5,
+    keywords=["api", "microservices", "agile"]
+)
+
+SAMPLE_JOBS = (
+    JobResult(
+        title="Senior Python Developer",
+        company="Tech Corp",
+        location="San Francisco, CA",
+        description="Looking for experienced Python developer with AWS knowledge",
+        job_url="https://linkedin.com/jobs/123",
+        match_score=85.5,
+        matched_keywords=["Python", "AWS"]
+    ),
+    JobResult(
+        title="React Frontend Developer",
+        company="StartupXYZ",
+        location="Remote",
+        description="Frontend developer needed for React applications",
+        job_url="https://linkedin.com/jobs/456",
+        match_score=72.3,
+        matched_keywords=["React"]
+    )
+)
 
 @pytest.fixture
 def sample_resume_data():
     """Sample resume data for testing"""
-    return ResumeData(
-        name="John Doe",
-        email="john.doe@example.com",
-        skills=["Python", "React", "AWS", "Docker"],
-        experience_level="senior",
-        job_titles=["Software Engineer", "Senior Developer"],
-        years_of_experience=5,
-        keywords=["api", "microservices", "agile"]
-    )
+    return SAMPLE_RESUME_DATA.model_copy(deep=True)
 
 @pytest.fixture
 def sample_jobs():
     """Sample job results for testing"""
-    return [
-        JobResult(
-            title="Senior Python Developer",
-            company="Tech Corp",
-            location="San Francisco, CA",
-            description="Looking for experienced Python developer with AWS knowledge",
-            job_url="https://linkedin.com/jobs/123",
-            match_score=85.5,
-            matched_keywords=["Python", "AWS"]
-        ),
-        JobResult(
-            title="React Frontend Developer",
-            company="StartupXYZ",
-            location="Remote",
-            description="Frontend developer needed for React applications",
-            job_url="https://linkedin.com/jobs/456",
-            match_score=72.3,
-            matched_keywords=["React"]
-        )
-    ]
+    return [job.model_copy(deep=True) for job in SAMPLE_JOBS]
 
 class TestHealthEndpoint:
     """Test health check endpoint"""
     
-    def test_health_check(self):
+    @pytest.mark.asyncio
+    async def test_health_check(self, aclient):
         """Test health endpoint returns correct response"""
-        response = client.get("/api/v1/health")
+        response = await aclient.get("/api/v1/health")
         assert response.status_code == 200
         data = response.json()
         assert data["status"] == "healthy"
@@ -71,8 +100,9 @@ class TestJobSearchEndpoint:
     @patch('services.resume_parser.ResumeParser.parse_pdf')
     @patch('services.linkedin_scraper.LinkedInScraper.search_jobs')
     @patch('services.job_matcher.JobMatcher.rank_jobs')
-    def test_search_jobs_success(self, mock_rank_jobs, mock_search_jobs, mock_parse_pdf, 
-                                sample_pdf_file, sample_resume_data, sample_jobs):
+    @pytest.mark.asyncio
+    async def test_search_jobs_success(self, mock_rank_jobs, mock_search_jobs, mock_parse_pdf, 
+                                       aclient, sample_pdf_file, sample_resume_data, sample_jobs):
         """Test successful job search"""
         # Setup mocks
         mock_parse_pdf.return_value = sample_resume_data
@@ -80,7 +110,7 @@ class TestJobSearchEndpoint:
         mock_rank_jobs.return_value = sample_jobs
         
         # Make request
-        response = client.post(
+        response = await aclient.post(
             "/api/v1/search-jobs",
             files={"file": sample_pdf_file},
             data={"location": "San Francisco", "max_results": "10"}
@@ -102,12 +132,13 @@ class TestJobSearchEndpoint:
         assert job["company"] == "Tech Corp"
         assert job["match_score"] == 85.5
     
-    def test_search_jobs_invalid_file_type(self):
+    @pytest.mark.asyncio
+    async def test_search_jobs_invalid_file_type(self, aclient):
         """Test rejection of non-PDF files"""
         # Create a non-PDF file
         file_content = ("test.txt", io.BytesIO(b"Not a PDF"), "text/plain")
         
-        response = client.post(
+        response = await aclient.post(
             "/api/v1/search-jobs",
             files={"file": file_content}
         )
@@ -115,17 +146,19 @@ class TestJobSearchEndpoint:
         assert response.status_code == 400
         assert "Only PDF files are supported" in response.json()["detail"]
     
-    def test_search_jobs_no_file(self):
+    @pytest.mark.asyncio
+    async def test_search_jobs_no_file(self, aclient):
         """Test request without file"""
-        response = client.post("/api/v1/search-jobs")
+        response = await aclient.post("/api/v1/search-jobs")
         assert response.status_code == 422  # Validation error
     
     @patch('services.resume_parser.ResumeParser.parse_pdf')
-    def test_search_jobs_parsing_error(self, mock_parse_pdf, sample_pdf_file):
+    @pytest.mark.asyncio
+    async def test_search_jobs_parsing_error(self, mock_parse_pdf, aclient, sample_pdf_file):
         """Test handling of resume parsing errors"""
         mock_parse_pdf.side_effect = ValueError("Failed to parse PDF")
         
-        response = client.post(
+        response = await aclient.post(
             "/api/v1/search-jobs",
             files={"file": sample_pdf_file}
         )
@@ -133,6 +166,38 @@ class TestJobSearchEndpoint:
         assert response.status_code == 500
         assert "Processing error" in response.json()["detail"]
 
+class TestCandidateSearchEndpoint:
+    """Test CrustData candidate search endpoint"""
+    
+    @patch('services.crustdata_api.CrustDataAPI.search_candidates_from_job_description', new_callable=AsyncMock)
+    @pytest.mark.asyncio
+    async def test_find_candidates_top_k(self, mock_search, aclient):
+        """Test that only the top_k ranked candidates are returned"""
+        mock_search.return_value = {
+            'parsing_info': {'filters_used': {'keywords': ['Python']}},
+            'profiles': [{'name': f"Candidate {i}", 'skills': ['Python']} for i in range(5)]
+        }
+        
+        response = await aclient.post(
+            "/api/v1/find-candidates",
+            json={"job_description": "Senior Python developer", "top_k": 2}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_found"] == 2
+        assert len(data["candidates"]) == 2
+        assert data["search_filters"]["top_k"] == 2
+    
+    @pytest.mark.asyncio
+    async def test_find_candidates_invalid_top_k(self, aclient):
+        """Test rejection of a non-positive top_k"""
+        response = await aclient.post(
+            "/api/v1/find-candidates",
+            json={"job_description": "Senior Python developer", "top_k": 0}
+        )
+        assert response.status_code == 422  # Validation error
+
 class TestResumeParser:
     """Test resume parser functionality"""
     
@@ -145,14 +210,139 @@ class TestResumeParser:
         
         # Mock file upload
         mock_file = Mock()
-        mock_file.read = asyncio.coroutine(lambda: b"John Doe\njohn@example.com\nPython Developer\n5 years experience")
+        mock_file.read = AsyncMock(return_value=b"John Doe\njohn@example.com\nPython Developer\n5 years experience")
         
-        with patch.object(parser, '_extract_text_pypdf2', return_value="John Doe\njohn@example.com\nPython Developer\n5 years experience"):
+        with patch.object(parser, '_extract_text_pymupdf', return_value="John Doe\njohn@example.com\nPython Developer\n5 years experience"):
             result = await parser.parse_pdf(mock_file)
             
             assert isinstance(result, ResumeData)
             assert result.name == "John Doe"
             assert result.email == "john@example.com"
+            mock_file.read.assert_awaited_once()
+    
+    def test_skills_leftmost_longest(self):
+        """Test that skills nested in longer skills are not also reported"""
+        from services.resume_parser import ResumeParser
+        
+        parser = ResumeParser()
+        
+        assert parser._extract_skills("javascript, sql server, python") == ["javascript", "sql server", "python"]
+        # Repeated mentions are deduplicated in first-mention order
+        assert parser._extract_skills("python, javascript, python") == ["python", "javascript"]
+    
+    def test_education_keywords_match_whole_words(self):
+        """Test that short degree keywords are not matched inside other words"""
+        from services.resume_parser import ResumeParser
+        
+        parser = ResumeParser()
+        result = parser._parse_text_content(
+            "Jane Doe\nBuilt distributed systems in bash\nMS in Computer Science, Stanford University\n"
+            "AWS Certified Solutions Architect"
+        )
+        
+        assert result.education == ["MS in Computer Science, Stanford University"]
+        assert result.certifications == ["AWS Certified Solutions Architect"]
+    
+    def test_extract_name_from_first_lines(self):
+        """Test that the name is the first of the leading lines made of 2-4 words"""
+        from services.resume_parser import ResumeParser
+        
+        parser = ResumeParser()
+        
+        assert parser._extract_name(["Senior Python Engineer at Acme Corp Inc", "jane@example.com", "José García"]) == "José García"
+        assert parser._extract_name(["J. R. Smith"]) == "J. R. Smith"
+        assert parser._extract_name(["Python 3 Developer", "Jane"]) is None
+
+class TestResumeCache:
+    """Test the persistent resume cache"""
+    
+    def test_resume_data_round_trip(self, tmp_path):
+        """Test storing and loading parsed resume data"""
+        from services.resume_cache import ResumeCache
+        
+        cache = ResumeCache(str(tmp_path / "resume_cache.db"))
+        cache.put_resume_data("v1:abc", {"name": "John Doe"})
+        
+        assert cache.get_resume_data("v1:abc") == {"name": "John Doe"}
+        assert cache.get_resume_data("v2:abc") is None
+    
+    def test_unwritable_path_disables_cache(self, tmp_path):
+        """Test that an unusable database path degrades to no caching"""
+        from services.resume_cache import ResumeCache
+        
+        # A regular file where the cache directory should be makes mkdir fail
+        blocker = tmp_path / "blocker"
+        blocker.write_text("")
+        cache = ResumeCache(str(blocker / "resume_cache.db"))
+        
+        cache.put_resume_data("v1:abc", {"name": "John Doe"})
+        assert cache.get_resume_data("v1:abc") is None
+
+class TestResumeFetcher:
+    """Test resume URL fetching"""
+    
+    @pytest.mark.asyncio
+    async def test_google_docs_txt_export_strips_bom(self):
+        """Test that Google Docs are fetched as a txt export without the byte order mark"""
+        from services.resume_fetcher import ResumeFetcher
+        
+        fetcher = ResumeFetcher()
+        body = "\ufeffJane Doe\r\n\r\nSenior Python developer with 8 years of backend experience".encode("utf-8")
+        download = AsyncMock(return_value=(200, "text/plain; charset=utf-8", "utf-8", body))
+        
+        with patch.object(fetcher, '_download', download):
+            result = await fetcher.fetch_resume_text("https://docs.google.com/document/d/abc123/edit")
+        
+        assert result.success
+        assert result.text == "Jane Doe Senior Python developer with 8 years of backend experience"
+        assert result.metadata['format'] == "txt"
+        download.assert_awaited_once_with(
+            "https://docs.google.com/document/d/abc123/export?format=txt", raise_for_status=False
+        )
+    
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("content_type,content_length,reason", [
+        ("application/pdf", 50 * 1024 * 1024, "File too large"),
+        ("image/png", 1024, "Unsupported content type"),
+    ])
+    async def test_direct_file_rejected_by_head(self, content_type, content_length, reason):
+        """Test that oversized or non-resume files are rejected before the body is downloaded"""
+        from services.resume_fetcher import ResumeFetcher
+        
+        fetcher = ResumeFetcher()
+        session = MagicMock()
+        session.head.return_value.__aenter__.return_value = Mock(
+            status=200, headers={'content-type': content_type}, content_length=content_length
+        )
+        
+        with patch.object(fetcher, '_get_session', AsyncMock(return_value=session)), \
+             patch.object(fetcher, '_download', AsyncMock()) as download:
+            result = await fetcher.fetch_resume_text("https://example.com/resume.pdf")
+        
+        assert not result.success
+        assert reason in result.error
+        download.assert_not_awaited()
+    
+    @pytest.mark.asyncio
+    async def test_download_stops_past_size_cap(self):
+        """Test that a body without a declared length is cut off once it exceeds the cap"""
+        from services.resume_fetcher import ResumeFetcher
+        
+        fetcher = ResumeFetcher()
+        fetcher.max_download_bytes = 100_000
+        
+        async def iter_chunked(size):
+            for _ in range(10):
+                yield b"x" * size
+        
+        response = Mock(status=200, content_length=None, headers={'content-type': 'application/pdf'})
+        response.content.iter_chunked = iter_chunked
+        session = MagicMock()
+        session.get.return_value.__aenter__.return_value = response
+        
+        with patch.object(fetcher, '_get_session', AsyncMock(return_value=session)):
+            with pytest.raises(ValueError, match="File too large"):
+                await fetcher._download("https://example.com/resume.pdf")
 
 class TestJobMatcher:
     """Test job matching functionality"""
@@ -207,11 +397,175 @@ class TestLinkedInScraper:
                 
                 assert isinstance(jobs, list)
 
+class TestOpenAIJobParser:
+    """Test the job description filter cache"""
+    
+    @pytest.fixture
+    def parser(self, monkeypatch):
+        """Parser whose OpenAI client returns canned filters"""
+        from services.openai_job_parser import OpenAIJobParser
+        
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        parser = OpenAIJobParser()
+        parser.client = Mock()
+        parser.client.chat.completions.create.return_value = Mock(
+            choices=[Mock(message=Mock(content='{"job_titles": ["Python Developer"]}'))]
+        )
+        return parser
+    
+    def test_different_descriptions_do_not_collide(self, parser):
+        """Test that distinct descriptions sharing boilerplate each get a GPT parse"""
+        parser.parse_job_description("Senior Python developer at Acme. Acme is an equal opportunity employer.")
+        parser.parse_job_description("Frontend React engineer at Acme. Acme is an equal opportunity employer.")
+        
+        assert parser.client.chat.completions.create.call_count == 2
+    
+    def test_identical_description_skips_openai(self, parser):
+        """Test that a repeated description is served without any OpenAI call"""
+        first = parser.parse_job_description("Senior Python developer")
+        second = parser.parse_job_description("Senior Python developer")
+        
+        assert second == first
+        assert parser.client.chat.completions.create.call_count == 1
+        parser.client.embeddings.create.assert_not_called()
+    
+    def test_no_cache_forces_fresh_parse(self, parser):
+        """Test that use_cache=False neither reads nor writes the cache"""
+        parser.parse_job_description("Senior Python developer", use_cache=False)
+        parser.parse_job_description("Senior Python developer", use_cache=False)
+        parser.parse_job_description("Senior Python developer")
+        
+        assert parser.client.chat.completions.create.call_count == 3
+
+class TestResumeEmbeddingService:
+    """Test batch resume processing"""
+    
+    def test_batch_records_errors_per_resume(self, monkeypatch):
+        """Test that one failed parse does not overwrite the other finished resumes"""
+        from services.resume_embedding_service import ResumeEmbeddingService
+        
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        service = ResumeEmbeddingService()
+        
+        def parse(full_text):
+            if full_text == "bad":
+                raise ValueError("GPT parse failed")
+            return {'name': full_text}
+        
+        files = [("good.pdf", b"good", "url"), ("bad.pdf", b"bad", "url"), ("also_good.pdf", b"also_good", "url")]
+        with patch.object(service, '_prepare_resume',
+                          side_effect=lambda name, content, url: {'file_name': name, 'full_text': content.decode()}), \
+             patch.object(service, 'parse_resume_content', side_effect=parse), \
+             patch.object(service, 'generate_embeddings_batch', side_effect=lambda texts: [[0.1]] * len(texts)), \
+             patch.object(service, '_finalize_resume',
+                          side_effect=lambda prepared, parsed, embedding: {'metadata': parsed}):
+            results = service.process_resumes_batch(files)
+        
+        assert results[0] == {'metadata': {'name': "good"}}
+        assert isinstance(results[1], ValueError)
+        assert results[2] == {'metadata': {'name': "also_good"}}
+        service.close()
+    
+    def test_fallback_parse_is_not_cached(self, monkeypatch, tmp_path):
+        """Test that a failed GPT parse is not stored in the persistent resume cache"""
+        from services.resume_cache import ResumeCache
+        from services.resume_embedding_service import ResumeEmbeddingService
+        
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        service = ResumeEmbeddingService()
+        service.resume_cache = ResumeCache(str(tmp_path / "resume_cache.db"))
+        service.openai_client = Mock()
+        service.openai_client.chat.completions.create.side_effect = RuntimeError("OpenAI down")
+        
+        parsed = service.parse_resume_content("John Doe, Python developer")
+        prepared = {'id': "resume_1", 'content_md5': "abc", 'content_hash': "def",
+                    'file_name': "cv.pdf", 'drive_url': "url", 'full_text': "John Doe, Python developer"}
+        result = service._finalize_resume(prepared, parsed, [0.1] * 1536)
+        
+        assert result['metadata']['name'] == "Unknown"
+        assert '_fallback' not in result['parsed_data']
+        assert service.resume_cache.get("abc") is None
+        service.resume_cache.close()
+
+class TestResumeManager:
+    """Test Google Drive resume ingestion"""
+    
+    @pytest.mark.asyncio
+    async def test_ingest_processes_each_file_once(self):
+        """Test that each file is processed once, errors are kept per resume and a partial batch is upserted"""
+        from services.resume_manager import ResumeManager
+        
+        with patch('services.resume_manager.GoogleDriveService'), \
+             patch('services.resume_manager.PineconeService'), \
+             patch('services.resume_manager.ResumeEmbeddingService'):
+            manager = ResumeManager()
+        
+        names = ["a.pdf", "b.pdf", "bad_download.pdf", "bad_parse.pdf", "c.pdf"]
+        manager.drive_service.list_resume_files.return_value = [{'id': name, 'name': name} for name in names]
+        
+        async def download(file_info):
+            if file_info['name'] == "bad_download.pdf":
+                raise IOError("Drive download failed")
+            return file_info['name'], b"content", "url"
+        
+        def process_batch(files):
+            return [
+                ValueError("GPT parse failed") if name == "bad_parse.pdf" else {'metadata': {'name': name}}
+                for name, _, _ in files
+            ]
+        
+        manager.embedding_service.process_resumes_batch.side_effect = process_batch
+        with patch.object(manager, '_download_resume', side_effect=download) as download_resume:
+            result = await manager.ingest_all_resumes()
+        
+        downloaded = sorted(call.args[0]['name'] for call in download_resume.call_args_list)
+        assert downloaded == sorted(names)
+        processed = [name for call in manager.embedding_service.process_resumes_batch.call_args_list
+                     for name, _, _ in call.args[0]]
+        assert sorted(processed) == ["a.pdf", "b.pdf", "bad_parse.pdf", "c.pdf"]
+        
+        assert result['processed'] == 3
+        assert result['failed'] == 2
+        assert {failure['name']: failure['error'] for failure in result['failed_files']} == {
+            "bad_download.pdf": "Drive download failed",
+            "bad_parse.pdf": "GPT parse failed"
+        }
+        manager.pinecone_service.batch_upsert_resumes.assert_called_once()
+        upserted = manager.pinecone_service.batch_upsert_resumes.call_args.args[0]
+        assert sorted(resume['metadata']['name'] for resume in upserted) == ["a.pdf", "b.pdf", "c.pdf"]
+        manager.close()
+
+class TestPineconeService:
+    """Test Pinecone vector operations against the real gRPC index signature"""
+    
+    def test_batch_upsert_matches_grpc_index(self, monkeypatch):
+        """Test that batch upserts only use arguments GRPCIndex.upsert accepts"""
+        from pinecone.grpc import GRPCIndex
+        from services.pinecone_service import PineconeService
+        
+        monkeypatch.setenv("PINECONE_API_KEY", "test-key")
+        service = PineconeService()
+        # Autospec enforces the installed client's signature, so unsupported kwargs fail here
+        service._index = create_autospec(GRPCIndex, instance=True)
+        
+        resumes = [
+            {'id': f"resume_{i}", 'embedding': [0.1] * service.dimension, 'metadata': {'name': f"Candidate {i}"}}
+            for i in range(250)
+        ]
+        service.batch_upsert_resumes(resumes, batch_size=100)
+        
+        calls = service._index.upsert.call_args_list
+        assert sorted(len(call.kwargs['vectors']) for call in calls) == [50, 100, 100]
+        assert all(set(call.kwargs) == {'vectors'} for call in calls)
+        vector = calls[0].kwargs['vectors'][0]
+        assert '_scale' not in vector['metadata']
+        assert all(isinstance(value, float) for value in vector['values'])
+
 class TestIntegration:
     """Integration tests"""
     
     @pytest.mark.asyncio
-    async def test_full_pipeline_mock(self, sample_resume_data, sample_jobs):
+    async def test_full_pipeline_mock(self, aclient, sample_resume_data, sample_jobs):
         """Test full pipeline with mocked components"""
         with patch('services.resume_parser.ResumeParser.parse_pdf', return_value=sample_resume_data):
             with patch('services.linkedin_scraper.LinkedInScraper.search_jobs', return_value=sample_jobs):
@@ -219,7 +573,7 @@ class TestIntegration:
                     
                     file_content = ("test.pdf", io.BytesIO(b"PDF content"), "application/pdf")
                     
-                    response = client.post(
+                    response = await aclient.post(
                         "/api/v1/search-jobs",
                         files={"file": file_content},
                         data={"max_results": "5"}
@@ -1,25 +1,35 @@
 """Custom exceptions for the LinkedIn job scraper"""
 
 class LinkedInScraperException(Exception):
-    """Base exception for LinkedIn scraper"""
-    pass
+    """Base exception for LinkedIn scraper
+    
+    Each subclass sets a class-level ``code`` so handlers can classify
+    failures with a single attribute lookup instead of isinstance chains.
+    """
+    __slots__ = ()
+    code = "generic"
 
 class ResumeParsingError(LinkedInScraperException):
     """Raised when resume parsing fails"""
-    pass
+    __slots__ = ()
+    code = "resume_parsing"
 
 class ScrapingError(LinkedInScraperException):
     """Raised when web scraping fails"""
-    pass
+    __slots__ = ()
+    code = "scraping"
 
 class RateLimitError(LinkedInScraperException):
     """Raised when rate limit is exceeded"""
-    pass
+    __slots__ = ()
+    code = "rate_limit"
 
 class AuthenticationError(LinkedInScraperException):
     """Raised when LinkedIn authentication fails"""
-    pass
+    __slots__ = ()
+    code = "auth"
 
 class ValidationError(LinkedInScraperException):
     """Raised when input validation fails"""
-    pass
+    __slots__ = ()
+    code = "validation"